@@ -0,0 +1,62 @@
+import hashlib
+import pathlib
+
+from panda3d.core import Filename
+
+
+class AssetCache:
+    """Save the procedurally made nodes, including their Bullet shapes, to .bam files,
+       and load them on later launches instead of making them again.
+       The key is the hash of the parameters and the source files which make the nodes,
+       so the nodes are made again when any of them changes.
+        Args:
+            cache_dir (str): The directory of the .bam files.
+            sources (list of str): The glob patterns of the source files to be hashed.
+    """
+
+    def __init__(self, cache_dir='cache', sources=('scene.py', 'road.py', 'shapes/**/*.py')):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.sources = sources
+        self.enabled = True
+        self._source_hash = None
+
+    @property
+    def source_hash(self):
+        if self._source_hash is None:
+            sha = hashlib.sha1()
+
+            for pattern in self.sources:
+                for path in sorted(pathlib.Path().glob(pattern)):
+                    sha.update(str(path).encode())
+                    sha.update(path.read_bytes())
+
+            self._source_hash = sha.hexdigest()
+
+        return self._source_hash
+
+    def get_path(self, name, params):
+        sha = hashlib.sha1(self.source_hash.encode())
+        sha.update(repr(sorted(params.items())).encode())
+        return self.cache_dir / f'{name}_{sha.hexdigest()[:16]}.bam'
+
+    def load(self, name, params):
+        """Return the cached node, or None if not cached."""
+        if not self.enabled or not (path := self.get_path(name, params)).exists():
+            return None
+
+        model = base.loader.load_model(Filename.from_os_specific(str(path)), noCache=True)
+        return model.node()
+
+    def save(self, name, params, np):
+        if not self.enabled:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        np.write_bam_file(Filename.from_os_specific(str(self.get_path(name, params))))
+
+    def clear(self):
+        for path in self.cache_dir.glob('*.bam'):
+            path.unlink()
+
+
+asset_cache = AssetCache()
@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from panda3d.core import NodePath
+from panda3d.core import FontPool, ModelPool, TexturePool
+
+
+TEXTURES = [
+    'textures/stones_01.jpg',
+    'textures/grass_02.png',
+    'textures/water.png',
+    'textures/concrete_01.jpg',
+    'textures/board.jpg',
+    'textures/metalboard.jpg',
+    'textures/paper_04.jpg',
+]
+
+FONTS = [
+    'font/Candaral.ttf',
+    'font/segoeui.ttf',
+]
+
+MODELS = [
+    'models/blue-sky/blue-sky-sphere',
+]
+
+
+class AssetManager:
+    """Load the textures, fonts and models on a thread pool and keep the handles,
+       so that the later requests for the same path return them immediately.
+        Args:
+            max_workers (int): The number of the threads loading the assets.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.futures = {}
+        self.load_times = {}
+        self.executor = None
+
+    def preload(self, textures=TEXTURES, fonts=FONTS, models=MODELS):
+        """Start loading the assets in the background; this returns immediately."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='asset_loader')
+
+        for paths, load in [(textures, TexturePool.load_texture),
+                            (fonts, FontPool.load_font),
+                            (models, ModelPool.load_model)]:
+            for path in paths:
+                if path not in self.futures:
+                    self.futures[path] = self.executor.submit(self.load, path, load)
+
+    def load(self, path, load):
+        start = time.perf_counter()
+        handle = load(path)
+        self.load_times[path] = (time.perf_counter() - start) * 1000
+
+        if handle is None:
+            raise IOError(f'Could not load {path}')
+
+        return handle
+
+    def get(self, path, load):
+        if (future := self.futures.get(path)) is not None:
+            return future.result()
+
+        handle = self.load(path, load)
+        self.futures[path] = DoneFuture(handle)
+        return handle
+
+    def texture(self, path):
+        return self.get(path, TexturePool.load_texture)
+
+    def font(self, path):
+        return self.get(path, FontPool.load_font)
+
+    def model(self, path):
+        """Return a copy of the model like Loader.load_model."""
+        node = self.get(path, ModelPool.load_model)
+        return NodePath(node).copy_to(NodePath())
+
+    def get_report(self):
+        """Return [(path, ms), ...] of the loaded assets, slowest first."""
+        return sorted(self.load_times.items(), key=lambda item: item[1], reverse=True)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+class DoneFuture:
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+assets = AssetManager()
@@ -1,52 +1,298 @@
 from panda3d.bullet import BulletBoxShape
 from panda3d.bullet import BulletRigidBodyNode
-from panda3d.core import NodePath
-from panda3d.core import Vec3, BitMask32
+from panda3d.core import NodePath, PandaNode
+from panda3d.core import Vec3, TransformState
+from panda3d.core import GeomEnums, OmniBoundingVolume, Shader, Texture
 
+import numpy as np
+
+from assets import assets
+from geom_cache import geom_cache
+from layers import Layer
 from shapes import Box
 
 
 class Baggage(NodePath):
 
-    def __init__(self, name, pos, model, tex):
+    def __init__(self, name, model, shape):
         super().__init__(BulletRigidBodyNode(name))
-        self.model = model
-        self.model.reparent_to(self)
-        self.set_pos(pos)
-        self.set_texture(tex)
+        # model is None, if the baggages are drawn by BaggageInstances.
+        if model is not None:
+            self.model = model
+            self.model.reparent_to(self)
 
-        self.set_collide_mask(BitMask32.bit(1))
+        self.set_collide_mask(Layer.BAGGAGE.mask)
         self.node().set_friction(1)
         self.node().set_restitution(0.1)
         self.node().set_mass(10)
         # self.node().set_deactivation_enabled(False)
-
-        end, tip = self.model.get_tight_bounds()
-        shape = BulletBoxShape((tip - end) / 2)
         self.node().add_shape(shape)
 
+    def reset(self, pos):
+        """Bring the baggage back to the pos, stopping it completely."""
+        self.set_pos_hpr(pos, Vec3(0, 0, 0))
+        self.node().set_linear_velocity(Vec3(0, 0, 0))
+        self.node().set_angular_velocity(Vec3(0, 0, 0))
+        self.node().clear_forces()
+        self.node().set_active(True)
+
+
+class BaggageInstances(NodePath):
+    """Draw all of the baggages in one call by hardware instancing.
+       The transforms of the rigid bodies are copied to a buffer texture every frame.
+       In the shadow pass, the light replaces the shader with a depth-only one by the tag state.
+        Args:
+            model (NodePath): The baggage model.
+            max_count (int): The maximum number of the instances.
+            light (NodePath): The light casting shadows.
+    """
+
+    def __init__(self, model, max_count, light):
+        super().__init__(PandaNode('baggage_instances'))
+        model.reparent_to(self)
+        # Instances are anywhere the rigid bodies are, so bounds of the model cannot be used.
+        self.node().set_bounds(OmniBoundingVolume())
+        self.node().set_final(True)
+
+        self.transforms = Texture('baggage_transforms')
+        self.transforms.setup_buffer_texture(
+            max_count * 4, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        # The positions and the quaternions (r, i, j, k) of the baggages, filled every frame.
+        self.pos_quats = np.zeros((max_count, 7), dtype=np.float32)
+
+        shader = Shader.load(Shader.SL_GLSL, 'shaders/baggage_v.glsl', 'shaders/baggage_f.glsl')
+        self.set_shader(shader)
+        self.set_shader_input('transforms', self.transforms)
+        self.setup_shadow_pass(light)
+        self.hide()
+
+    def setup_shadow_pass(self, light):
+        shader = Shader.load(Shader.SL_GLSL, 'shaders/baggage_v.glsl', 'shaders/shadow_f.glsl')
+        state_np = NodePath('baggage_shadow_state')
+        state_np.set_shader(shader, 1)
+
+        light.node().set_tag_state_key('shadow')
+        light.node().set_tag_state('instanced', state_np.get_state())
+        self.set_tag('shadow', 'instanced')
+
+    def update(self, baggages):
+        if (count := len(baggages)) == 0:
+            self.hide()
+            return
+
+        self.show()
+        self.set_instance_count(count)
+        pos_quats = self.pos_quats[:count]
+        pos_quats[:] = [(*baggage.get_pos(self), *baggage.get_quat(self)) for baggage in baggages]
+
+        arr = np.frombuffer(memoryview(self.transforms.modify_ram_image()), dtype=np.float32)
+        self.write_matrices(pos_quats, arr[:count * 16].reshape(count, 4, 4))
+
+    @staticmethod
+    def write_matrices(pos_quats, mats):
+        """Write the matrices made from the positions and the quaternions into mats,
+           in the row-vector convention of panda3d; the rows are the rotated axes and the position.
+        """
+        x, y, z, r, i, j, k = pos_quats.T
+        mats[:, 0, 0] = 1 - 2 * (j * j + k * k)
+        mats[:, 0, 1] = 2 * (i * j + k * r)
+        mats[:, 0, 2] = 2 * (i * k - j * r)
+        mats[:, 1, 0] = 2 * (i * j - k * r)
+        mats[:, 1, 1] = 1 - 2 * (i * i + k * k)
+        mats[:, 1, 2] = 2 * (j * k + i * r)
+        mats[:, 2, 0] = 2 * (i * k + j * r)
+        mats[:, 2, 1] = 2 * (j * k - i * r)
+        mats[:, 2, 2] = 1 - 2 * (i * i + j * j)
+        mats[:, :3, 3] = 0
+        mats[:, 3, 0] = x
+        mats[:, 3, 1] = y
+        mats[:, 3, 2] = z
+        mats[:, 3, 3] = 1
+
+
+class StackFreezer:
+    """Merge the baggages settled on the cart into the cart body as one compound rigid body,
+       so that Bullet does not solve the contacts of the stack while the cart drives calmly.
+       The stack breaks back into the dynamic baggages when the acceleration, the roll
+       or the pitch of the cart goes past the thresholds; an impact is a spike of the acceleration.
+        Args:
+            cart (BulletCart): The cart.
+            half_extents (Vec3): The half size of a baggage.
+            settle_speed (float): The speed relative to the cart under which a baggage is still.
+            settle_time (float): How long the baggages must be still to freeze the stack.
+            max_accel (float): The acceleration of the cart breaking the stack, in m/s^2.
+            max_tilt (float): The roll or pitch of the cart breaking the stack, in degrees.
+    """
+
+    def __init__(self, cart, half_extents, settle_speed=0.05, settle_time=0.5, max_accel=3.0, max_tilt=8.0):
+        self.cart = cart
+        self.half_extents = half_extents
+        self.settle_speed = settle_speed
+        self.settle_time = settle_time
+        self.max_accel = max_accel
+        self.max_tilt = max_tilt
+        self.frozen = {}
+        self.reset()
+
+    def reset(self):
+        self.still_time = 0
+        self.velocity = None
+        self.last_local = {}
+        self.freezes = 0
+        self.breaks = 0
+        self.frozen_steps = 0
+
+    def update(self, baggages, dt):
+        velocity = Vec3(self.cart.node().get_linear_velocity())
+        accel = 0 if self.velocity is None else (velocity - self.velocity).length() / dt
+        self.velocity = velocity
+        calm = accel <= self.max_accel and not self.is_tilted()
+
+        if self.frozen:
+            if calm:
+                self.follow_cart()
+                self.frozen_steps += 1
+            else:
+                self.thaw()
+                self.breaks += 1
+            return
+
+        if (on_cart := self.find_still_baggages(baggages, dt)) and calm:
+            self.still_time += dt
+
+            if self.still_time >= self.settle_time:
+                self.freeze(on_cart)
+                self.freezes += 1
+        else:
+            self.still_time = 0
+
+    def is_tilted(self):
+        hpr = self.cart.get_hpr(base.render)
+        return abs(hpr.y) > self.max_tilt or abs(hpr.z) > self.max_tilt
+
+    def find_still_baggages(self, baggages, dt):
+        """Return the baggages on the cart if all of them stay still on the cart, otherwise None."""
+        half_x = self.cart.size.x / 2
+        half_y = self.cart.size.y / 2
+        last_local = self.last_local
+        self.last_local = {}
+        still = True
+        on_cart = []
+
+        for baggage in baggages:
+            pos = baggage.get_pos(self.cart)
+
+            if abs(pos.x) > half_x or abs(pos.y) > half_y or pos.z < 0:
+                continue
+
+            self.last_local[baggage] = pos
+            last = last_local.get(baggage)
+
+            if last is None or (pos - last).length() / dt > self.settle_speed:
+                still = False
+
+            on_cart.append(baggage)
+
+        return on_cart if still else None
+
+    def freeze(self, baggages):
+        for baggage in baggages:
+            mat = baggage.get_mat(self.cart)
+            # Each baggage has its own shape, to remove it from the compound one by one.
+            shape = BulletBoxShape(self.half_extents)
+            base.world.remove(baggage.node())
+            self.cart.node().add_shape(shape, TransformState.make_mat(mat))
+            self.frozen[baggage] = (shape, mat)
+
+        handling = self.cart.handling
+        mass = handling['mass'] + sum(baggage.node().get_mass() for baggage in self.frozen)
+        self.cart.node().set_mass(mass)
+        # Bullet scales the suspension forces by the chassis mass, so they are scaled back
+        # to carry the stack as the suspension did while the baggages lay on the cart.
+        ratio = handling['mass'] / mass
+
+        for wheel in self.cart.vehicle.get_wheels():
+            wheel.set_suspension_stiffness(handling['suspension_stiffness'] * ratio)
+            wheel.set_wheels_damping_relaxation(handling['damping_relaxation'] * ratio)
+            wheel.set_wheels_damping_compression(handling['damping_compression'] * ratio)
+
+    def follow_cart(self):
+        for baggage, (_, mat) in self.frozen.items():
+            baggage.set_mat(self.cart, mat)
+
+    def thaw(self):
+        """Put the frozen baggages back to the world, moving with the cart."""
+        center = self.cart.get_pos(base.render)
+        angular_velocity = self.cart.node().get_angular_velocity()
+
+        for baggage, (shape, mat) in self.frozen.items():
+            self.cart.node().remove_shape(shape)
+            baggage.set_mat(self.cart, mat)
+            r = baggage.get_pos(base.render) - center
+            baggage.node().set_linear_velocity(self.velocity + angular_velocity.cross(r))
+            baggage.node().set_angular_velocity(angular_velocity)
+            base.world.attach(baggage.node())
+
+        self.frozen.clear()
+        self.last_local.clear()
+        self.cart.set_handling(self.cart.handling)
+        self.still_time = 0
+
 
 class Baggages:
+    """Keep the baggages for max_layers alive in the pool,
+       and attach only the baggages the selected level needs.
+        Args:
+            instanced (bool): If True, all of the baggages are drawn by hardware instancing.
+            freezing (bool): If True, the settled stack is frozen into the cart by StackFreezer.
+    """
 
-    def __init__(self, width=0.5, depth=0.5, height=0.25):
+    def __init__(self, width=0.5, depth=0.5, height=0.25, max_layers=4, instanced=False, freezing=False):
         self.size = Vec3(width, depth, height)
+        self.instanced = instanced
         self.root_np = NodePath('baggages')
         self.root_np.reparent_to(base.render)
 
         self.cart = base.controller.cart
+        self.freezer = StackFreezer(self.cart, self.size / 2) if freezing else None
         self.cols = int(self.cart.size.x) * 2   # 2 * 2 = 4
         self.rows = int(self.cart.size.y) * 2   # 4 * 2 = 8
-        self.model_maker = Box(
+        self.model_params = dict(
             width=self.size.x, depth=self.size.y, height=self.size.z)
+        self.pool = self.create_pool(max_layers)
 
-    def load(self, stack_layers=1):
-        cart_center = self.cart.body.get_pos(base.render)
+    def create_pool(self, max_layers):
+        # All of the baggages are the same size, so the shape can be shared.
+        shape = BulletBoxShape(self.size / 2)
+        pool = []
+
+        for name, _ in self.get_layout(max_layers):
+            model = None if self.instanced else geom_cache.create(Box, **self.model_params)
+            pool.append(Baggage(name, model, shape))
+
+        if self.instanced:
+            model = geom_cache.create(Box, **self.model_params)
+            self.instances = BaggageInstances(model, len(pool), base.scene.day_light)
+            self.instances.reparent_to(base.render)
+
+        return pool
+
+    def set_cart(self, cart):
+        """Carry the baggages on another cart, like the one made for a new BulletWorld."""
+        self.cart = cart
+
+        if self.freezer:
+            self.freezer.cart = cart
+
+    def get_layout(self, stack_layers):
+        """Yield the names and the positions relative to the center of the cart body.
+           The layout of fewer layers is the beginning of that of more layers.
+        """
         start_x = -self.cart.size.x / 2 + self.size.x / 2   # -0.75
         start_y = -self.cart.size.y / 2 + self.size.y / 2   # -1.75
         start_z = self.cart.size.z / 2 + self.size.z / 2    # 0.375
         half_x = self.size.x / 2                            # 0.25
         half_y = self.size.y / 2                            # 0.25
-        tex = base.loader.load_texture('textures/paper_04.jpg')
 
         for n in range(stack_layers):
             offset_x = half_x * n
@@ -58,13 +304,44 @@ class Baggages:
 
                 for j in range(self.rows - n):
                     y = start_y + j * self.size.y + offset_y
-                    pos = cart_center + Vec3(x, y, z)
-                    model = self.model_maker.create()
-                    baggage = Baggage(f'baggage_{n}{i}{j}', pos, model, tex)
-                    baggage.reparent_to(self.root_np)
-                    base.world.attach(baggage.node())
+                    yield f'baggage_{n}{i}{j}', Vec3(x, y, z)
+
+    def set_texture(self):
+        """Give the baggages the texture when they are first loaded, not when they are made,
+           so that the game does not wait for the texture loaded in the background while starting.
+        """
+        if not self.root_np.has_texture():
+            tex = assets.texture('textures/paper_04.jpg')
+            self.root_np.set_texture(tex)
+
+            if self.instanced:
+                self.instances.set_texture(tex)
+
+    def load(self, stack_layers=1):
+        self.set_texture()
+        cart_center = self.cart.body.get_pos(base.render)
+
+        for baggage, (_, offset) in zip(self.pool, self.get_layout(stack_layers)):
+            baggage.reset(cart_center + offset)
+            baggage.reparent_to(self.root_np)
+            base.world.attach(baggage.node())
+
+        if self.freezer:
+            self.freezer.reset()
+
+    def update(self, dt=0):
+        if self.freezer and dt > 0:
+            self.freezer.update(self.root_np.get_children(), dt)
+
+        if self.instanced:
+            self.instances.update(self.root_np.get_children())
 
     def clean_up(self):
+        if self.freezer:
+            self.freezer.thaw()
+
         for baggage in self.root_np.get_children():
             base.world.remove(baggage.node())
-            baggage.remove_node()
\ No newline at end of file
+            baggage.detach_node()
+
+        self.update()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Compare loading the assets one by one with the loader and
+   preloading them on the thread pool of AssetManager.
+
+    >python benchmarks/bench_assets.py
+"""
+import time
+
+from common import setup_base
+
+from panda3d.core import FontPool, ModelPool, TexturePool
+
+from assets import AssetManager, TEXTURES, FONTS, MODELS
+
+
+def release_all():
+    TexturePool.release_all_textures()
+    FontPool.release_all_fonts()
+    ModelPool.release_all_models()
+
+
+def load_sequentially():
+    for path in TEXTURES:
+        base.loader.load_texture(path)
+    for path in FONTS:
+        base.loader.load_font(path)
+    for path in MODELS:
+        base.loader.load_model(path)
+
+
+def load_in_parallel(manager):
+    manager.preload()
+
+    for path in TEXTURES:
+        manager.texture(path)
+    for path in FONTS:
+        manager.font(path)
+    for path in MODELS:
+        manager.model(path)
+
+
+def measure_ms(func, *args):
+    release_all()
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    setup_base()
+    measure_ms(load_sequentially)
+
+    sequential_ms = min(measure_ms(load_sequentially) for _ in range(3))
+    managers = [AssetManager() for _ in range(3)]
+    parallel_ms = min(measure_ms(load_in_parallel, manager) for manager in managers)
+    print(f'loader one by one {sequential_ms:.2f} ms, AssetManager.preload {parallel_ms:.2f} ms')
+
+    for path, ms in managers[-1].get_report():
+        print(f'{path:<40}{ms:>8.2f} ms')
+
+    for manager in managers:
+        manager.shutdown()
+
+
+if __name__ == '__main__':
+    main()
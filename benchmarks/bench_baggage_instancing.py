@@ -0,0 +1,84 @@
+"""Compare the baggages drawn one node each with those drawn by hardware instancing,
+   by the frame time and the update time with the level 4 baggages on the cart,
+   and the packing of the transforms into the buffer texture with the former list comprehension.
+   Both are compared without shadows, because the shader generator may fail on some drivers
+   (e.g. llvmpipe) and then the per-node baggages render no shadow pass, while the instanced ones
+   always do; the last row is the instanced baggages with the shadow pass.
+   This renders frames offscreen, so an OpenGL driver (e.g. Mesa) is needed.
+
+    >python benchmarks/bench_baggage_instancing.py
+"""
+import time
+
+import numpy as np
+
+from common import measure, setup_base
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from scene import Scene
+
+
+def run(baggages, frames=300, dt=1 / 60):
+    update_ms = 0
+    start = time.perf_counter()
+
+    for _ in range(frames):
+        base.world.do_physics(dt)
+        update_start = time.perf_counter()
+        baggages.update(dt)
+        update_ms += (time.perf_counter() - update_start) * 1000
+        base.graphicsEngine.render_frame()
+
+    return (time.perf_counter() - start) / frames * 1000, update_ms / frames
+
+
+def pack_list(instances, baggages):
+    """The former packing, which flattens the matrices into a list of floats."""
+    count = len(baggages)
+    arr = np.frombuffer(memoryview(instances.transforms.modify_ram_image()), dtype=np.float32)
+    arr[:count * 16] = [v for baggage in baggages for row in baggage.get_mat(instances) for v in row]
+
+
+def main():
+    base = setup_base('offscreen')
+    base.scene = Scene()
+    base.scene.reparent_to(base.render)
+    base.controller = controller = CartController(BulletCart())
+    base.camera.set_pos(controller.cart.get_pos() + (0, -12, 8))
+    base.camera.look_at(controller.cart)
+
+    light = base.scene.day_light.node()
+    light.set_shadow_caster(False)
+    print(f'{"baggages":>17} {"nodes":>6} {"frame ms":>9} {"update ms":>10}')
+
+    for label, instanced, shadows in [('per-node', False, False), ('instanced', True, False),
+                                      ('instanced+shadows', True, True)]:
+        if shadows:
+            light.set_shadow_caster(True, *light.get_shadow_buffer_size())
+        else:
+            baggages = Baggages(instanced=instanced)
+
+        baggages.load(4)
+        # Render frames until the lazily made buffers and shaders are ready.
+        for _ in range(30):
+            base.graphicsEngine.render_frame()
+
+        frame_ms, update_ms = run(baggages)
+        count = baggages.root_np.get_num_children()
+        print(f'{label:>17} {1 if instanced else count:>6} {frame_ms:>9.3f} {update_ms:>10.4f}')
+        baggages.clean_up()
+
+        if not instanced:
+            baggages.root_np.remove_node()
+
+    baggages.load(4)
+    instances = baggages.instances
+    children = baggages.root_np.get_children()
+    list_ms = measure(lambda: pack_list(instances, children))
+    numpy_ms = measure(lambda: instances.update(children))
+    print(f'packing {len(children)} transforms: list {list_ms:.4f} ms, pos/quat + numpy {numpy_ms:.4f} ms')
+
+
+if __name__ == '__main__':
+    main()
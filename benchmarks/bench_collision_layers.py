@@ -0,0 +1,56 @@
+"""Compare the collision layers with all of the nodes colliding with each other,
+   by the contact manifolds (the pairs which passed the broadphase filter)
+   and the do_physics time, with the level 4 baggages on the cart.
+
+    >python benchmarks/bench_collision_layers.py
+"""
+import time
+
+from common import setup_base
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from layers import ALL_INTERACTIONS, INTERACTIONS, set_interactions
+from scene import Scene
+
+
+def run(frames=600, dt=1 / 60):
+    manifolds = 0
+    start = time.perf_counter()
+
+    for _ in range(frames):
+        base.world.do_physics(dt)
+        manifolds += base.world.get_num_manifolds()
+
+    return (time.perf_counter() - start) / frames * 1000, manifolds / frames
+
+
+def run_level(controller, baggages, level=4, repeat=3):
+    """Return the best physics ms and the mean pairs of the rounds."""
+    results = []
+
+    for _ in range(repeat):
+        controller.setup_cart()
+        baggages.load(level)
+        results.append(run())
+        baggages.clean_up()
+
+    return min(ms for ms, _ in results), sum(pairs for _, pairs in results) / repeat
+
+
+def main():
+    base = setup_base()
+    base.scene = Scene()
+    base.controller = controller = CartController(BulletCart())
+    baggages = Baggages()
+
+    print(f'{"interactions":>12} {"pairs":>7} {"physics ms":>11}')
+
+    for label, interactions in [('all', ALL_INTERACTIONS), ('layers', INTERACTIONS)]:
+        set_interactions(base.world, interactions)
+        physics_ms, pairs = run_level(controller, baggages)
+        print(f'{label:>12} {pairs:>7.1f} {physics_ms:>11.4f}')
+
+
+if __name__ == '__main__':
+    main()
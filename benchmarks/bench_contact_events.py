@@ -0,0 +1,74 @@
+"""Measure the game-over check of ContactMonitor.check_game_over with the level 4 baggages on the moving cart.
+   The check drains the contact events, and checks the wheels and the body corners against
+   the terrain and the waves analytically only while any of the wheels is off the road;
+   the analytic part is also measured alone, as it ran every frame before.
+   The event cost is the time to send the contact events to ContactMonitor.
+
+    >python benchmarks/bench_contact_events.py
+"""
+import time
+
+from common import setup_base
+
+from direct.showbase.DirectObject import DirectObject
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from contacts import ContactMonitor
+from scene import Scene
+
+
+def main(frames=600, dt=1 / 60):
+    base = setup_base()
+    base.scene = scene = Scene()
+    cart = BulletCart()
+    base.controller = controller = CartController(cart)
+    monitor = ContactMonitor()
+    baggages = Baggages()
+
+    controller.setup_cart()
+    baggages.load(4)
+    monitor.reset()
+
+    # Let the baggages settle, which adds most of the contact points.
+    for _ in range(120):
+        base.world.do_physics(dt)
+        base.eventMgr.doEvents()
+
+    counter = DirectObject()
+    counter.count = 0
+    counter.accept('bullet-contact-added', lambda *_: setattr(counter, 'count', counter.count + 1))
+
+    cart.apply_engine_and_brake(100, 0)
+    event_sec = check_sec = analytic_sec = 0
+    quiet_frames = 0
+    road_frames = 0
+
+    for _ in range(frames):
+        base.world.do_physics(dt)
+        count = counter.count
+
+        start = time.perf_counter()
+        base.eventMgr.doEvents()
+        event_sec += time.perf_counter() - start
+        quiet_frames += counter.count == count
+
+        start = time.perf_counter()
+        monitor.check_game_over(controller, scene)
+        check_sec += time.perf_counter() - start
+        road_frames += controller.is_on_road()
+
+        start = time.perf_counter()
+        controller.detect_grounding(scene.terrain) or controller.detect_submersion(scene.water_surface)
+        analytic_sec += time.perf_counter() - start
+
+    print(f'contact events: {event_sec / frames * 1000:.4f} ms per frame, '
+          f'{counter.count / frames:.2f} events per frame, {quiet_frames} of {frames} frames without events')
+    print(f'check_game_over: {check_sec / frames * 1000:.4f} ms per frame, '
+          f'{road_frames} of {frames} frames with all of the wheels on the road')
+    print(f'analytic checks alone: {analytic_sec / frames * 1000:.4f} ms per frame')
+    print(f'baggages dropped: {monitor.dropped_count} {monitor.dropped_names}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Record the frame times around the start of the camera fade, comparing the
+   former fade, which made a new buffer every time, with CameraFader.
+   This renders frames offscreen, so an OpenGL driver (e.g. Mesa) is needed.
+
+    >python benchmarks/bench_fade.py
+"""
+import time
+
+from common import setup_base
+
+from direct.interval.IntervalGlobal import Sequence, Func
+from panda3d.core import Point3, TransparencyAttrib
+
+from scene import Scene
+from transition import CameraFader
+
+
+def fade_legacy(pos, look_at, duration, callback):
+    """The former DeliveryCart.fade_camera, kept as the baseline."""
+    size = base.win.get_size()
+    buffer = base.win.make_texture_buffer('tex_buffer', *size)
+    buffer.set_clear_color_active(True)
+    buffer.set_clear_color((0.5, 0.5, 0.5, 1))
+
+    temp_cam = base.make_camera(buffer)
+    temp_cam.node().get_lens().set_fov(90)
+    temp_cam.reparent_to(base.render)
+    temp_cam.set_pos(pos)
+    temp_cam.look_at(look_at)
+
+    card = buffer.get_texture_card()
+    card.reparent_to(base.render2d)
+    card.set_transparency(TransparencyAttrib.M_alpha)
+
+    Sequence(
+        card.colorScaleInterval(duration, 1, 0, blendType='easeInOut'),
+        Func(base.camera.set_pos, pos),
+        Func(base.camera.look_at, look_at),
+        Func(card.remove_node),
+        Func(temp_cam.remove_node),
+        Func(base.graphicsEngine.remove_window, buffer),
+        Func(callback)
+    ).start()
+
+
+def record(fade, rounds=5, frames=10, duration=0.2):
+    """Return the worst frame time within the first frames after each fade start, in ms."""
+    spikes = []
+    positions = [(Point3(0, 124, 60), Point3(124, -124, 0)), (Point3(-120, -5, 24), Point3(0, 0, 0))]
+
+    for i in range(rounds):
+        ended = []
+        pos, look_at = positions[i % 2]
+        fade(pos, look_at, duration, lambda: ended.append(True))
+        frame_times = []
+
+        while not ended or len(frame_times) < frames:
+            start = time.perf_counter()
+            base.taskMgr.step()
+            frame_times.append(time.perf_counter() - start)
+
+        spikes.append(max(frame_times[:frames]) * 1000)
+
+    return spikes
+
+
+def main():
+    base = setup_base('offscreen')
+    base.scene = Scene()
+
+    for _ in range(30):
+        base.taskMgr.step()
+
+    fader = CameraFader()
+    for label, fade in [('legacy', fade_legacy), ('CameraFader', fader.fade)]:
+        spikes = record(fade)
+        print(f'{label:>12}: fade start spike ms ' + ', '.join(f'{ms:.2f}' for ms in spikes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Measure the time to make the baggage pool, with and without the geometry
+   template cache, and the time of Baggages.load and clean_up at each level.
+
+    >python benchmarks/bench_level_load.py
+"""
+import time
+
+from common import setup_base
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from geom_cache import geom_cache
+from scene import Scene
+
+
+def measure_ms(func, repeat=5):
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best * 1000
+
+
+def main():
+    base = setup_base()
+    base.scene = Scene()
+    base.controller = CartController(BulletCart())
+    max_size = geom_cache.max_size
+
+    geom_cache.max_size = 0
+    no_cache_ms = measure_ms(Baggages)
+    geom_cache.max_size = max_size
+    cache_ms = measure_ms(Baggages)
+    print(f'Baggages(): no cache {no_cache_ms:.3f} ms, cache {cache_ms:.3f} ms')
+    print(f'cache hits {geom_cache.hits}, misses {geom_cache.misses}')
+
+    baggages = Baggages()
+    print(f'{"level":>5} {"baggages":>9} {"load ms":>8} {"clean_up ms":>12}')
+
+    for level in range(1, 5):
+        load_ms = measure_ms(lambda: (baggages.load(level), baggages.clean_up()))
+        baggages.load(level)
+        num = baggages.root_np.get_num_children()
+        clean_up_ms = measure_ms(baggages.clean_up, repeat=1)
+        print(f'{level:>5} {num:>9} {load_ms - clean_up_ms:>8.3f} {clean_up_ms:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
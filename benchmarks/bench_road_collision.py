@@ -0,0 +1,93 @@
+"""Compare the triangle mesh collision shape of the road with the convex pieces,
+   by do_physics time with the cart and the level 4 baggages on the road,
+   by the cost of the downward rays the BulletVehicle casts from the wheels,
+   and by the rays of a grid over the road which hit or miss differently from the mesh.
+
+    >python benchmarks/bench_road_collision.py
+"""
+import time
+
+from common import setup_base, measure
+
+from panda3d.core import Point3, Vec3
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from scene import Road, Scene
+
+
+def replace_road(scene, convex_pieces):
+    base.world.remove(scene.road.node())
+    scene.road.remove_node()
+    scene.road = Road(convex_pieces=convex_pieces)
+    scene.road.set_pos(0, 0, 1)
+    scene.road.reparent_to(scene)
+    base.world.attach(scene.road.node())
+
+
+def cast_grid(step=2):
+    """Return whether the vertical rays of a grid over the road hit it."""
+    hits = []
+
+    for x in range(-128, 129, step):
+        for y in range(-40, 41, step):
+            result = base.world.ray_test_closest(Point3(x, y, 30), Point3(x, y, 10))
+            hits.append(result.has_hit() and result.get_node() == base.scene.road.node())
+
+    return hits
+
+
+def physics_ms(frames=300, dt=1 / 60):
+    start = time.perf_counter()
+
+    for _ in range(frames):
+        base.world.do_physics(dt)
+
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    base = setup_base()
+    base.scene = scene = Scene()
+    cart = BulletCart()
+    base.controller = controller = CartController(cart)
+    baggages = Baggages()
+
+    print(f'{"shape":>9} {"shapes":>7} {"cart ms":>8} {"level 4 ms":>11} {"ray ms":>8} {"lost":>5} {"grid diff":>10}')
+
+    for convex_pieces in [None, 4, 8, 16]:
+        replace_road(scene, convex_pieces)
+
+        controller.setup_cart()
+        cart_ms = physics_ms()
+
+        controller.setup_cart()
+        baggages.load(4)
+        cart.apply_engine_and_brake(100, 0)
+        level_ms = physics_ms()
+        cart.apply_engine_and_brake(0, 0)
+        z = cart.get_z(base.render)
+        lost = sum(b.get_z(base.render) < z for b in baggages.root_np.get_children())
+        baggages.clean_up()
+
+        controller.setup_cart()
+        base.world.do_physics(1 / 60)
+        rays = [(w.get_chassis_connection_point_cs(), w.get_wheel_direction_cs())
+                for w in cart.vehicle.get_wheels()]
+        rays = [(base.render.get_relative_point(cart, p),
+                 base.render.get_relative_point(cart, p + Vec3(d) * 2)) for p, d in rays]
+        ray_ms = measure(lambda: [base.world.ray_test_closest(Point3(f), Point3(t)) for f, t in rays])
+
+        hits = cast_grid()
+        if convex_pieces is None:
+            mesh_hits = hits
+        diff = sum(a != b for a, b in zip(hits, mesh_hits))
+
+        label = 'mesh' if convex_pieces is None else f'convex {convex_pieces}'
+        shapes = scene.road.node().get_num_shapes()
+        print(f'{label:>9} {shapes:>7} {cart_ms:>8.4f} {level_ms:>11.4f} {ray_ms:>8.4f} {lost:>5} '
+              f'{f"{diff}/{len(hits)}":>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Compare making the road geometry by merging the Cylinder half rings one by one
+   with sweeping all of them at once by RoadMaker, by the build time and the memory
+   at 4, 64 and 512 half rings. The memory is the peak of the Python allocations, including numpy,
+   while building, and the bytes of the vertices and the indices of the result.
+
+    >python benchmarks/bench_road_geometry.py
+    >python benchmarks/bench_road_geometry.py --max-merge 512
+"""
+import argparse
+import time
+import tracemalloc
+
+from common import setup_base
+
+from panda3d.core import Point3, Vec3
+
+from road import RoadMaker, winding_center_line
+from shapes import Cylinder
+
+
+def build_merge(segs_x, seg, radius, inner_radius):
+    """The former Road.create_road, kept as the baseline."""
+    model_maker = Cylinder(radius=radius, inner_radius=inner_radius, ring_slice_deg=180, height=1)
+    geom_node = model_maker.get_geom_node()
+
+    for i in range(1, segs_x):
+        new_geom_node = model_maker.get_geom_node()
+        rotation_deg = 0 if i % 2 == 0 else 180
+        model_maker.merge_geom(geom_node, new_geom_node, Vec3(0, 0, 1), Point3(seg * i, 0, 0), rotation_deg)
+
+    return geom_node
+
+
+def build_numpy(segs_x, seg, radius, inner_radius):
+    points = winding_center_line(segs_x, seg, (radius + inner_radius) / 2)
+    return RoadMaker(width=radius - inner_radius, thickness=1).get_geom_node(points)
+
+
+def get_geom_bytes(geom_node):
+    geom = geom_node.get_geom(0)
+    vdata = geom.get_vertex_data()
+    size = sum(vdata.get_array(i).get_data_size_bytes() for i in range(vdata.get_num_arrays()))
+    return size + sum(geom.get_primitive(i).get_vertices().get_data_size_bytes()
+                      for i in range(geom.get_num_primitives()))
+
+
+def run(build, segs_x, size=240, road_width=6):
+    seg = size / segs_x
+    radius = seg / 2 + 3
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    geom_node = build(segs_x, seg, radius, radius - road_width)
+    build_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    vertices = geom_node.get_geom(0).get_vertex_data().get_num_rows()
+    return vertices, build_ms, peak, get_geom_bytes(geom_node)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-merge', type=int, default=64,
+                        help='The largest number of half rings merged one by one; it grows quadratically.')
+    args = parser.parse_args()
+
+    setup_base()
+    print(f'{"builder":>8} {"segs":>5} {"vertices":>9} {"build ms":>9} {"peak KiB":>9} {"geom KiB":>9}')
+
+    for segs_x in [4, 64, 512]:
+        for label, build in [('merge', build_merge), ('numpy', build_numpy)]:
+            if build is build_merge and segs_x > args.max_merge:
+                continue
+
+            vertices, build_ms, peak, geom_bytes = run(build, segs_x)
+            print(f'{label:>8} {segs_x:>5} {vertices:>9} {build_ms:>9.2f} '
+                  f'{peak / 1024:>9.1f} {geom_bytes / 1024:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
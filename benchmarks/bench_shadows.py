@@ -0,0 +1,69 @@
+"""Render frames offscreen while the cart runs along the road with the level 4 baggages,
+   and compare the shadow map tiers by the frame time, the time of the shadow pass
+   and the frames in which the light moved. The shadow pass time is the difference of
+   the frame times of the same frames rendered with the shadow buffer active and inactive.
+   The baggages are drawn by instancing, whose shader samples the shadow map, so the buffer
+   is made even where the shader generator fails (e.g. llvmpipe).
+   This renders frames offscreen, so an OpenGL driver (e.g. Mesa) is needed.
+
+    >python benchmarks/bench_shadows.py
+"""
+import time
+
+from common import setup_base
+
+from panda3d.core import Point3
+
+from baggage import Baggages
+from cart import BulletCart, CartController
+from scene import Scene
+
+
+def run(scene, target, frames=300):
+    moves = 0
+    start = time.perf_counter()
+
+    for i in range(frames):
+        target.set_pos(Point3(-120 + i * 0.4, 0, 21))
+        scene.day_light.update(target)
+        base.graphicsEngine.render_frame()
+        moves += scene.day_light.moved
+
+    return (time.perf_counter() - start) / frames * 1000, moves
+
+
+def main():
+    base = setup_base('offscreen')
+    base.scene = scene = Scene()
+    base.controller = controller = CartController(BulletCart())
+    baggages = Baggages(instanced=True)
+    baggages.load(4)
+    baggages.update()
+    light = scene.day_light
+    gsg = base.win.get_gsg()
+
+    base.camera.reparent_to(controller.cart)
+    base.camera.set_pos(0, -12, 8)
+    base.camera.look_at(controller.cart)
+
+    print(f'{"shadows":>7} {"frame ms":>9} {"no pass ms":>11} {"shadow ms":>10} {"moves":>6}')
+
+    for size in (1024, 2048, 4096):
+        light.set_shadow_size(size)
+        # Render frames until the buffer of the new size is made and warmed up.
+        for _ in range(30):
+            base.graphicsEngine.render_frame()
+
+        if (buffer := light.node().get_shadow_buffer(gsg)) is None:
+            print('No shadow buffer was made.')
+            return
+
+        frame_ms, moves = run(scene, controller.cart)
+        buffer.set_active(False)
+        no_pass_ms, _ = run(scene, controller.cart)
+        buffer.set_active(True)
+        print(f'{size:>7} {frame_ms:>9.3f} {no_pass_ms:>11.3f} {frame_ms - no_pass_ms:>10.3f} {moves:>6}')
+
+
+if __name__ == '__main__':
+    main()
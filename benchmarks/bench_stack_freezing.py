@@ -0,0 +1,55 @@
+"""Compare the stack freezing with the dynamic baggages at level 4, by the physics time
+   per step and the results of the deliveries, on a calm drive and on the default script.
+   Every run is in a new process, so that the results are reproducible.
+
+    >python benchmarks/bench_stack_freezing.py
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from common import ROOT  # noqa: F401, sets the path to the repository root.
+
+from cart import Status
+
+
+CALM_SCRIPT = [
+    (3.0, None, Status.ACCELERATE),
+    (3.0, None, None),
+    (2.0, None, Status.DECELERATE),
+]
+
+
+def run(freezing, script_name, level=4):
+    from headless import Simulation, DEFAULT_SCRIPT
+
+    script = CALM_SCRIPT if script_name == 'calm' else DEFAULT_SCRIPT
+    sim = Simulation(freezing=freezing)
+    result = sim.run_delivery(script, level)
+
+    if freezing:
+        result['freezes'] = sim.baggages.freezer.freezes
+        result['breaks'] = sim.baggages.freezer.breaks
+        result['frozen_steps'] = sim.baggages.freezer.frozen_steps
+
+    return result
+
+
+def main():
+    cases = [(script, freezing) for script in ('calm', 'default') for freezing in (False, True)]
+    ctx = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(1, mp_context=ctx, max_tasks_per_child=1) as executor:
+        results = [executor.submit(run, freezing, script).result() for script, freezing in cases]
+
+    print(f'{"script":>8} {"freezing":>9} {"physics ms":>11} {"game over":>10} {"on cart":>8} '
+          f'{"distance":>9} {"freezes":>8} {"breaks":>7} {"frozen steps":>13}')
+
+    for (script, freezing), r in zip(cases, results):
+        print(f'{script:>8} {str(freezing):>9} {r["physics_ms"] / r["steps"]:>11.4f} {str(r["game_over"]):>10} '
+              f'{r["baggages_on_cart"]:>4}/{r["baggages"]:<3} {r["distance"]:>9.3f} '
+              f'{r.get("freezes", "-"):>8} {r.get("breaks", "-"):>7} '
+              f'{r.get("frozen_steps", 0):>6}/{r["steps"]:<6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Measure the construction time of Scene with the cold and the warm asset cache,
+   and the time-to-first-frame and the time-to-interactive of the game, with and without
+   the preload of AssetManager. The game is launched in a new process with an offscreen window
+   for each measurement, so an OpenGL driver (e.g. Mesa) is needed. The time-to-interactive is
+   the time until the level selector runs without a frame over 1/30 seconds.
+
+    >python benchmarks/bench_startup.py
+    >python benchmarks/bench_startup.py --launches 5
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, setup_base
+from run import remove_scene
+
+from panda3d.core import Filename
+from panda3d.core import load_prc_file_data
+
+from asset_cache import asset_cache
+from scene import Scene, WaterSurface, Road
+
+
+def measure_ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def run_game(preload, launched, frames=60, budget=1 / 30):
+    """Start the game in this process and print the seconds from the launch as json.
+       The game is interactive from the end of the last frame over the budget in the first frames,
+       when the level selector is accepting the input without loading hitches.
+    """
+    load_prc_file_data('', f"""
+        window-type offscreen
+        audio-library-name null
+        model-path {Filename.from_os_specific(str(ROOT))}""")
+
+    from assets import assets
+    from delivery_cart import DeliveryCart, Status
+
+    if not preload:
+        # Every asset is loaded on the main thread when it is first used.
+        assets.preload = lambda *args, **kwargs: None
+
+    app = DeliveryCart()
+    app.taskMgr.step()
+    first_frame = interactive = time.time() - launched
+
+    for _ in range(frames):
+        start = time.time()
+        app.taskMgr.step()
+
+        if time.time() - start > budget or app.state != Status.SELECT_LEVEL:
+            interactive = time.time() - launched
+
+    print(json.dumps(dict(first_frame=first_frame, interactive=interactive)), flush=True)
+    # Mesa may abort while the offscreen window is torn down at exit, which would fail the launch.
+    os._exit(0)
+
+
+def launch_game(preload):
+    launched = time.time()
+    args = [sys.executable, __file__, '--child', str(int(preload)), str(launched)]
+    out = subprocess.run(args, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def measure_launches(launches):
+    # The first launch fills the asset cache and the OS file cache.
+    launch_game(True)
+
+    for preload in [False, True]:
+        results = [launch_game(preload) for _ in range(launches)]
+        first_frame = statistics.median(r['first_frame'] for r in results) * 1000
+        interactive = statistics.median(r['interactive'] for r in results) * 1000
+        label = 'preload' if preload else 'no preload'
+        print(f'game {label:<10}: time-to-first-frame {first_frame:.0f} ms, '
+              f'time-to-interactive {interactive:.0f} ms (median of {launches} launches)')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--launches', type=int, default=3, help='The launches of the game for each case.')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_game(bool(int(args.child[0])), float(args.child[1]))
+        return
+
+    setup_base()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        asset_cache.cache_dir = pathlib.Path(cache_dir)
+        asset_cache.enabled = False
+        # Load the textures and shaders into the pools first.
+        remove_scene(Scene())
+        disabled_ms, scene = measure_ms(Scene)
+        remove_scene(scene)
+
+        asset_cache.enabled = True
+        cold_ms, scene = measure_ms(Scene)
+        remove_scene(scene)
+        warm_ms, scene = measure_ms(Scene)
+        remove_scene(scene)
+        print(f'Scene(): no cache {disabled_ms:.2f} ms, cold {cold_ms:.2f} ms, warm {warm_ms:.2f} ms')
+
+        for cls, kwargs in [(WaterSurface, dict(segs_w=256, segs_d=256)), (Road, dict(segs_x=16))]:
+            cold_ms, np = measure_ms(lambda: cls(**kwargs))
+            np.remove_node()
+            warm_ms, np = measure_ms(lambda: cls(**kwargs))
+            np.remove_node()
+            print(f'{cls.__name__}({kwargs}): cold {cold_ms:.2f} ms, warm {warm_ms:.2f} ms')
+
+    measure_launches(args.launches)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Compare the Bullet contact test against the terrain heightfield
+   with the heightmap lookup of Terrain.
+
+    >python benchmarks/bench_terrain_height.py
+"""
+from common import setup_base, measure
+
+import numpy as np
+from panda3d.core import Point3
+
+from cart import BulletCart, CartController
+from scene import Scene
+
+
+def main():
+    base = setup_base()
+    base.scene = Scene()
+    cart = BulletCart()
+    base.controller = controller = CartController(cart)
+    terrain = base.scene.terrain
+
+    for label, pos in [('on the road', None), ('on the terrain', Point3(60, 60, 0))]:
+        if pos is None:
+            controller.setup_cart()
+        else:
+            pos.z = terrain.get_height(pos.x, pos.y) + 0.5
+            cart.set_pos(pos)
+
+        for _ in range(30):
+            base.world.do_physics(1 / 60)
+
+        contact_ms = measure(lambda: controller.detect_collision(terrain))
+        lookup_ms = measure(lambda: controller.detect_grounding(terrain))
+        hit = f'{bool(controller.detect_collision(terrain))}/{controller.detect_grounding(terrain)}'
+        print(f'{label}: contact_test_pair {contact_ms:.4f} ms, lookup {lookup_ms:.4f} ms, hit {hit}')
+
+    rng = np.random.default_rng(0)
+
+    for n in [1, 100, 10000]:
+        xs, ys = rng.uniform(-128, 128, (2, n))
+        single_ms = measure(lambda: [terrain.get_height(x, y) for x, y in zip(xs, ys)], number=10)
+        batch_ms = measure(lambda: terrain.get_heights(xs, ys), number=10)
+        print(f'{n:>6} points: get_height {single_ms:.4f} ms, get_heights {batch_ms:.4f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Drive a point east along the road of the tiled world, and compare making the missing tiles
+   on the main thread with loading their heightmaps on the background thread
+   and making their nodes over frames, a chunk of the terrain each frame,
+   by the update time per frame, the frames over the budget of 60 fps, the tiles made,
+   and the rigid bodies in the world, which should stay constant.
+   The heights on the shared edges of the neighbouring tiles are compared with those
+   of the tiles which were not mirrored.
+
+    >python benchmarks/bench_tiled_world.py
+"""
+import time
+
+import numpy as np
+
+from common import setup_base
+
+from panda3d.core import Point3
+
+from scene import TiledWorld
+
+
+def count_tiles(world):
+    return len(world.tiles) + sum(len(pool) for pool in world.pools.values())
+
+
+def run(world, wait, tiles=6, step=4, budget=1 / 60):
+    frame_ms = []
+    bodies = set()
+
+    for x in np.arange(0, world.tile_size * tiles, step):
+        start = time.perf_counter()
+        world.update(Point3(x, 0, 0), wait=wait)
+        elapsed = time.perf_counter() - start
+        frame_ms.append(elapsed * 1000)
+        bodies.add(base.world.get_num_rigid_bodies())
+        # Leave the rest of the frame to the background thread, like rendering does.
+        time.sleep(max(budget - elapsed, 0))
+
+    return np.array(frame_ms), bodies
+
+
+def get_seams(world):
+    """Return the largest height differences on the edges between the tile (0, 0) and its neighbours."""
+    half = world.tile_size / 2
+    coords = np.linspace(-half, half, 257)
+    center = world.tiles[(0, 0)].terrain
+    east = world.tiles[(1, 0)].terrain
+    north = world.tiles[(0, 1)].terrain
+    seam_x = np.abs(center.get_heights(np.full_like(coords, half), coords)
+                    - east.get_heights(np.full_like(coords, -half), coords)).max()
+    seam_y = np.abs(center.get_heights(coords, np.full_like(coords, half))
+                    - north.get_heights(coords, np.full_like(coords, -half))).max()
+    return seam_x, seam_y
+
+
+def main():
+    base = setup_base()
+    print(f'{"tiles":>10} {"made":>5} {"mean ms":>8} {"max ms":>8} {"over 60fps":>11} {"bodies":>7}')
+
+    for label, wait in [('main', True), ('background', False)]:
+        world = TiledWorld()
+        world.reparent_to(base.render)
+        world.update(Point3(0, 0, 0), wait=True)
+
+        if wait:
+            seams = get_seams(world)
+
+        frame_ms, bodies = run(world, wait)
+        bodies = f'{min(bodies)}-{max(bodies)}'
+        print(f'{label:>10} {count_tiles(world):>5} {frame_ms.mean():>8.3f} {frame_ms.max():>8.3f} '
+              f'{np.count_nonzero(frame_ms > 1000 / 60):>11} {bodies:>7}')
+
+        for tile in world.tiles.values():
+            tile.detach()
+
+        world.shutdown()
+        world.remove_node()
+
+    former = world.load_heightmap((0, 0))[1]
+    print(f'seams of mirrored tiles: x {seams[0]:.3f} m, y {seams[1]:.3f} m; '
+          f'not mirrored: x {np.abs(former[:, 0] - former[:, -1]).max():.3f} m, '
+          f'y {np.abs(former[0] - former[-1]).max():.3f} m')
+
+
+if __name__ == '__main__':
+    main()
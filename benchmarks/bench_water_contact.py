@@ -0,0 +1,47 @@
+"""Compare the Bullet contact test against the water triangle mesh
+   with the analytic water height query.
+
+    >python benchmarks/bench_water_contact.py
+"""
+from common import setup_base, measure
+
+from panda3d.core import Point3
+
+from cart import BulletCart, CartController
+from scene import Scene, WaterSurface
+
+
+def main():
+    base = setup_base()
+    base.scene = Scene()
+    cart = BulletCart()
+    base.controller = controller = CartController(cart)
+    base.world.remove(base.scene.water_surface.node())
+
+    print(f'{"segs":>9} {"cart":>13} {"contact ms":>11} {"analytic ms":>12} {"hit":>12}')
+
+    for segs in [16, 64, 256]:
+        water = WaterSurface(segs_w=segs, segs_d=segs)
+        water.reparent_to(base.scene)
+        base.world.attach(water.node())
+
+        for label, pos in [('on the road', None), ('in the water', Point3(0, 60, -1))]:
+            if pos is None:
+                controller.setup_cart()
+            else:
+                cart.set_pos(pos)
+
+            base.world.do_physics(1 / 60)
+            water.wave(0.5)
+
+            contact_ms = measure(lambda: controller.detect_collision(water))
+            analytic_ms = measure(lambda: controller.detect_submersion(water))
+            hit = f'{bool(controller.detect_collision(water))}/{controller.detect_submersion(water)}'
+            print(f'{segs:>4}x{segs:<4} {label:>13} {contact_ms:>11.4f} {analytic_ms:>12.4f} {hit:>12}')
+
+        base.world.remove(water.node())
+        water.remove_node()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compare the uniform water planes with WaterClipmap by the vertices waved per frame
+   and the milliseconds of WaterSurface.wave, seen from the camera following the cart.
+   This uses an offscreen window for the camera lens, so an OpenGL driver (e.g. Mesa) is needed.
+
+    >python benchmarks/bench_water_lod.py
+"""
+from common import setup_base, measure
+
+from panda3d.core import Point3
+
+from scene import WaterClipmap, WaterSurface
+
+
+def main():
+    base = setup_base('offscreen')
+    base.camLens.set_fov(90)
+    # The camera of DeliveryCart behind the cart at the start of the road.
+    base.camera.set_pos(Point3(-124, 5, 24))
+    base.camera.look_at(Point3(-124, -10, 20))
+
+    cases = [
+        ('plane 16x16 (16 m)', lambda: WaterSurface(segs_w=16, segs_d=16, collision_mesh=False)),
+        ('plane 256x256 (1 m)', lambda: WaterSurface(segs_w=256, segs_d=256, collision_mesh=False)),
+        ('clipmap (1 m - 8 m)', lambda: WaterClipmap(collision_mesh=False)),
+    ]
+    print(f'{"water":>20} {"vertices":>9} {"waved":>7} {"wave ms":>8}')
+
+    for label, create in cases:
+        water = create()
+        water.reparent_to(base.render)
+        wave_ms = measure(lambda: water.wave(1.0), number=100)
+
+        if isinstance(water, WaterClipmap):
+            vertices = sum(len(tile.wave_engine.x_terms) for tile in water.tiles)
+            waved = water.waved_vertices
+        else:
+            vertices = waved = len(water.wave_engine.x_terms)
+
+        print(f'{label:>20} {vertices:>9} {waved:>7} {wave_ms:>8.4f}')
+        water.remove_node()
+
+
+if __name__ == '__main__':
+    main()
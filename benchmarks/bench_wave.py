@@ -0,0 +1,56 @@
+"""Compare the per-frame cost of the python loop and numpy water waves.
+
+    >python benchmarks/bench_wave.py
+"""
+import math
+import pathlib
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from shapes import Plane
+from water import WaveEngine
+
+
+def wave_python(geom_node, stride, time, wave_h=3.0):
+    """The former WaterSurface.wave, kept as the baseline."""
+    geom = geom_node.modify_geom(0)
+    vdata = geom.modify_vertex_data()
+    vdata_arr = vdata.modify_array(0)
+    vdata_mem = memoryview(vdata_arr).cast('B').cast('f')
+
+    for i in range(0, len(vdata_mem), stride):
+        x, y = vdata_mem[i: i + 2]
+        z = (math.sin(time + x / wave_h) + math.sin(time + y / wave_h)) * wave_h / 2
+        vdata_mem[i + 2] = z
+
+
+def measure(func, frames):
+    time = 0.0
+
+    def frame():
+        nonlocal time
+        time += 1 / 60
+        func(time)
+
+    return min(timeit.repeat(frame, number=frames, repeat=3)) / frames * 1000
+
+
+def main():
+    print(f'{"segs":>9} {"vertices":>9} {"python ms":>10} {"numpy ms":>9} {"speedup":>8}')
+
+    for segs in [16, 64, 256, 512]:
+        plane = Plane(256, 256, segs, segs)
+        geom_node = plane.create().node()
+        engine = WaveEngine(geom_node, plane.stride)
+        frames = max(1, 4096 // segs)
+
+        py_ms = measure(lambda t: wave_python(geom_node, plane.stride, t), frames)
+        np_ms = measure(engine.wave, frames)
+        vertices = geom_node.get_geom(0).get_vertex_data().get_num_rows()
+        print(f'{segs:>4}x{segs:<4} {vertices:>9} {py_ms:>10.3f} {np_ms:>9.3f} {py_ms / np_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import pathlib
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# The scene loads assets by paths relative to the repository root,
+# and panda3d caches the working directory on import.
+os.chdir(ROOT)
+
+from direct.showbase.ShowBase import ShowBase
+from panda3d.core import Filename
+from panda3d.core import load_prc_file_data
+
+from layers import create_world
+
+
+def setup_base(window_type='none'):
+    """Start ShowBase without a window, having a BulletWorld like DeliveryCart.
+       Pass window_type='offscreen' to render frames, which needs an OpenGL driver.
+    """
+    load_prc_file_data('', f"""
+        window-type {window_type}
+        audio-library-name null
+        model-path {Filename.from_os_specific(str(ROOT))}
+        bullet-filter-algorithm groups-mask
+        bullet-enable-contact-events true""")
+
+    base = ShowBase()
+    # No camera is made without a window, but the terrain needs a focal point.
+    if base.camera is None:
+        base.camera = base.render.attach_new_node('camera')
+
+    base.world = create_world()
+    return base
+
+
+def measure(func, number=1000, repeat=3):
+    """Return the best milliseconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
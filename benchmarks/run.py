@@ -0,0 +1,204 @@
+"""Benchmark suite of the scene construction and the per-frame hot paths.
+   It runs without a window, so a machine without GPU can run it.
+
+    >python benchmarks/run.py --output results.json
+    >python benchmarks/run.py --compare base.json results.json --threshold 0.2
+"""
+import argparse
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+
+from common import setup_base, measure
+
+import panda3d
+
+
+def measure_once(func, repeat=3, clean_up=None):
+    """Return the best milliseconds of func, calling clean_up with its result after each run."""
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+        if clean_up is not None:
+            clean_up(result)
+
+    return best * 1000
+
+
+def remove_body(np):
+    base.world.remove(np.node())
+    np.remove_node()
+
+
+def remove_scene(scene):
+    for np in (scene.terrain, scene.water_surface, scene.road):
+        base.world.remove(np.node())
+
+    for light in (scene.ambient_light, scene.day_light):
+        base.render.clear_light(light)
+        light.remove_node()
+
+    scene.remove_node()
+
+
+def bench_construction(results):
+    from asset_cache import asset_cache
+    from scene import Scene, Terrain, WaterSurface, Road
+    from cart import BulletCart
+
+    # The runs after the first would load the .bam files of the first, so the cache is off
+    # for the construction from scratch, and the loads from the cache are separate results.
+    asset_cache.enabled = False
+    results['construct.scene'] = measure_once(Scene, clean_up=remove_scene)
+    results['construct.terrain'] = measure_once(
+        lambda: Terrain('terrains/heightmap.png'), clean_up=lambda np: np.remove_node())
+    results['construct.water_surface'] = measure_once(WaterSurface, clean_up=lambda np: np.remove_node())
+    results['construct.road'] = measure_once(Road, clean_up=lambda np: np.remove_node())
+    asset_cache.enabled = True
+
+    for name, func, clean_up in [('scene', Scene, remove_scene),
+                                 ('water_surface', WaterSurface, lambda np: np.remove_node()),
+                                 ('road', Road, lambda np: np.remove_node())]:
+        # The first construction saves the nodes to the cache.
+        clean_up(func())
+        results[f'construct.{name}.cached'] = measure_once(func, clean_up=clean_up)
+
+    def remove_cart(cart):
+        # Removing the vehicle removes the chassis too.
+        base.world.remove(cart.vehicle)
+        cart.remove_node()
+
+    results['construct.cart'] = measure_once(BulletCart, clean_up=remove_cart)
+
+    for level in range(1, 5):
+        results[f'construct.baggages_load.level{level}'] = measure_once(
+            lambda: base.baggages.load(level), clean_up=lambda _: base.baggages.clean_up())
+
+
+def bench_frame(results):
+    from scene import WaterSurface
+
+    for segs in [16, 64, 256]:
+        water = WaterSurface(segs_w=segs, segs_d=segs)
+        frame = iter(range(10 ** 9))
+        results[f'frame.wave.{segs}x{segs}'] = measure(lambda: water.wave(next(frame) / 60), number=20)
+        water.remove_node()
+
+    controller = base.controller
+    results['frame.contact_test.terrain'] = measure(lambda: controller.detect_collision(base.scene.terrain))
+    results['frame.contact_test.water'] = measure(lambda: controller.detect_collision(base.scene.water_surface))
+    results['frame.check.grounding'] = measure(lambda: controller.detect_grounding(base.scene.terrain))
+    results['frame.check.submersion'] = measure(lambda: controller.detect_submersion(base.scene.water_surface))
+
+    for level in range(0, 5):
+        if level:
+            base.baggages.load(level)
+
+        count = base.baggages.root_np.get_num_children()
+        results[f'frame.do_physics.baggages{count}'] = measure(lambda: base.physics.do_physics(1 / 60), number=60)
+        base.baggages.clean_up()
+        controller.setup_cart()
+
+
+def run():
+    from asset_cache import asset_cache
+    from baggage import Baggages
+    from cart import BulletCart, CartController
+    from physics import PhysicsScheduler
+    from scene import Scene
+
+    base = setup_base()
+    results = {}
+
+    # The benchmarks do not read or write the cache of the game.
+    with tempfile.TemporaryDirectory() as cache_dir:
+        asset_cache.cache_dir = pathlib.Path(cache_dir)
+        base.scene = Scene()
+        base.controller = CartController(BulletCart())
+        base.baggages = Baggages()
+        base.physics = PhysicsScheduler(base.world)
+
+        bench_construction(results)
+        bench_frame(results)
+
+    return dict(
+        meta=dict(
+            time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            python=platform.python_version(),
+            panda3d=panda3d.__version__,
+            platform=platform.platform(),
+        ),
+        results=results,
+    )
+
+
+def compare(base_path, new_path, threshold):
+    """Print the ratio of each result and return the names slower than 1 + threshold.
+       A result with a zero baseline has no ratio, and the results in only one of the files are listed.
+    """
+    with open(base_path) as f:
+        base_results = json.load(f)['results']
+    with open(new_path) as f:
+        new_results = json.load(f)['results']
+
+    regressions = []
+    print(f'{"name":<40}{"base ms":>10}{"new ms":>10}{"ratio":>8}')
+
+    for name in sorted(base_results.keys() & new_results.keys()):
+        old, new = base_results[name], new_results[name]
+
+        if not old:
+            print(f'{name:<40}{old:>10.4f}{new:>10.4f}{"n/a":>8}')
+            continue
+
+        ratio = new / old
+        flag = ''
+
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+
+        print(f'{name:<40}{old:>10.4f}{new:>10.4f}{ratio:>8.2f}{flag}')
+
+    for label, names in [('removed', base_results.keys() - new_results.keys()),
+                         ('added', new_results.keys() - base_results.keys())]:
+        for name in sorted(names):
+            old, new = base_results.get(name), new_results.get(name)
+            print(f'{name:<40}{"-" if old is None else f"{old:.4f}":>10}'
+                  f'{"-" if new is None else f"{new:.4f}":>10}{label:>8}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmarks or compare two results.')
+    parser.add_argument('--output', help='Write the results as json to this path.')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two results.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown regarded as a regression.')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        print(f'{len(regressions)} regressions')
+        sys.exit(1 if regressions else 0)
+
+    data = run()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    for name, ms in data['results'].items():
+        print(f'{name:<40}{ms:>10.4f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,11 @@ from enum import Enum, auto
 from panda3d.bullet import BulletBoxShape, ZUp
 from panda3d.bullet import BulletRigidBodyNode, BulletVehicle
 from panda3d.core import NodePath
-from panda3d.core import Vec3, Point3, TransformState, BitMask32
+from panda3d.core import Vec3, Point3, TransformState
 
+from assets import assets
+from geom_cache import geom_cache
+from layers import Layer, get_layer
 from shapes import Box, Cylinder
 
 
@@ -18,14 +21,33 @@ class Status(Enum):
     BACK = auto()
 
 
+# The tuning of the cart, which can be changed by BulletCart.set_handling.
+HANDLING = dict(
+    mass=800,
+    suspension_stiffness=40.0,
+    damping_relaxation=2.3,
+    damping_compression=4.4,
+    friction_slip=100.0,
+    roll_influence=0.1,
+    steering_clamp=45.0,        # degree
+    steering_increment=60,      # degree per second
+    engine_force=500,
+    brake_force=50,
+)
+
+
 class BulletCart(NodePath):
+    """Args:
+            handling (dict): The values to replace those of HANDLING.
+            textures (bool): If False, the textures are not set until set_textures is called,
+                             e.g. not to wait for the textures loaded in the background while starting.
+    """
 
-    def __init__(self, width=2, depth=4, height=0.5):
+    def __init__(self, width=2, depth=4, height=0.5, handling=None, textures=True):
         super().__init__(BulletRigidBodyNode('cart'))
         self.size = Vec3(width, depth, height)
 
-        self.set_collide_mask(BitMask32.bit(1))
-        self.node().set_mass(800)
+        self.set_collide_mask(Layer.CART.mask)
         self.node().set_deactivation_enabled(False)
         self.node().set_friction(1)
         self.node().set_restitution(0.1)
@@ -36,13 +58,28 @@ class BulletCart(NodePath):
 
         self.create_cart_body()
         self.create_cart_wheels()
+        self.set_handling(handling)
+
+        if textures:
+            self.set_textures()
+
         self.reparent_to(base.render)
         base.world.attach(self.node())
 
-        self.steering_clamp = 45.0         # degree
-        self.steering_increment = 60       # degree per second
+    def set_handling(self, handling=None):
+        self.handling = {**HANDLING, **(handling or {})}
+        self.node().set_mass(self.handling['mass'])
+        self.steering_clamp = self.handling['steering_clamp']
+        self.steering_increment = self.handling['steering_increment']
         # self.steering_increment = 120.0
 
+        for wheel in self.vehicle.get_wheels():
+            wheel.set_suspension_stiffness(self.handling['suspension_stiffness'])
+            wheel.set_wheels_damping_relaxation(self.handling['damping_relaxation'])
+            wheel.set_wheels_damping_compression(self.handling['damping_compression'])
+            wheel.set_friction_slip(self.handling['friction_slip'])
+            wheel.set_roll_influence(self.handling['roll_influence'])
+
     def create_cart_body(self):
         self.body = Box(
             self.size.x, self.size.y, self.size.z, segs_w=2, segs_d=4).create()
@@ -53,14 +90,9 @@ class BulletCart(NodePath):
         shape = BulletBoxShape((tip - end) / 2)
         self.node().add_shape(shape, TransformState.make_pos(Vec3(0, 0, 1)))
 
-        tex = base.loader.loadTexture('textures/board.jpg')
-        self.body.set_texture(tex)
         self.body.reparent_to(self)
 
     def create_cart_wheels(self):
-        model_maker = Cylinder(radius=0.25, height=0.25)
-        tex = base.loader.loadTexture('textures/metalboard.jpg')
-
         wheel_pos = {
             'front_right': Point3(0.875, 1.75, 0.875),
             'front_left': Point3(-0.875, 1.75, 0.875),
@@ -69,15 +101,21 @@ class BulletCart(NodePath):
         }
 
         for name, pos in wheel_pos.items():
-            model = model_maker.create()
+            model = geom_cache.create(Cylinder, radius=0.25, height=0.25)
             model.set_pos_hpr(pos, Vec3(90, 90, 0))
-            model.set_texture(tex)
             model.reparent_to(self)
 
             new_np = self.relocate(name, model)
             front = name.startswith('front')
             self.add_wheel(pos, front, new_np)
 
+    def set_textures(self):
+        self.body.set_texture(assets.texture('textures/board.jpg'))
+        tex = assets.texture('textures/metalboard.jpg')
+
+        for wheel in self.vehicle.get_wheels():
+            NodePath(wheel.get_node()).set_texture(tex)
+
     def relocate(self, name, model):
         """Create the new parent node under the original parent, bring the new parent
            to the center, and relocate the node without changing any of it's transformation.
@@ -100,11 +138,26 @@ class BulletCart(NodePath):
         wheel.set_wheel_radius(0.25)
         wheel.set_max_suspension_travel_cm(40.0)
 
-        wheel.set_suspension_stiffness(40.0)
-        wheel.set_wheels_damping_relaxation(2.3)
-        wheel.set_wheels_damping_compression(4.4)
-        wheel.set_friction_slip(100.0)
-        wheel.set_roll_influence(0.1)
+    def get_check_points(self):
+        """Return the bottoms of the wheels and the bottom corners of the body
+           relative to render, to check whether the cart touches something.
+        """
+        points = []
+
+        for wheel in self.vehicle.get_wheels():
+            pos = wheel.get_world_transform().get_row3(3)
+            pos.z -= wheel.get_wheel_radius()
+            points.append(Point3(pos))
+
+        mat = self.get_mat(base.render)
+        body_z = self.body.get_z() - self.size.z / 2
+        half_x = self.size.x / 2
+        half_y = self.size.y / 2
+
+        for x, y in [(-half_x, -half_y), (-half_x, half_y), (half_x, -half_y), (half_x, half_y)]:
+            points.append(mat.xform_point(Point3(x, y, body_z)))
+
+        return points
 
     def get_abs_speed(self):
         return abs(self.vehicle.get_current_speed_km_hour())
@@ -124,6 +177,23 @@ class BulletCart(NodePath):
         self.vehicle.set_brake(brake_force, 2)
         self.vehicle.set_brake(brake_force, 3)
 
+    def reset_motion(self):
+        """Stop the cart, and bring the wheels and the suspension back to rest,
+           so that the next round does not carry over the state of the last one.
+        """
+        self.node().set_linear_velocity(Vec3(0, 0, 0))
+        self.node().set_angular_velocity(Vec3(0, 0, 0))
+        self.node().clear_forces()
+        self.apply_steering(0)
+        self.apply_engine_and_brake(0, 0)
+
+        for wheel in self.vehicle.get_wheels():
+            wheel.set_rotation(0)
+            wheel.set_delta_rotation(0)
+            wheel.set_suspension_relative_velocity(0)
+
+        self.vehicle.reset_suspension()
+
 
 class CartController:
 
@@ -149,6 +219,10 @@ class CartController:
     def setup_cart(self):
         start_pos, start_hpr = base.scene.road.get_start_location()
         self.cart.set_pos_hpr(start_pos, start_hpr)
+        self.cart.reset_motion()
+        self.steering = 0
+        self.steering_state = None
+        self.driving_state = None
 
     def monitor_key(self, status, steering_control):
         if steering_control:
@@ -211,13 +285,13 @@ class CartController:
         match self.driving_state:
 
             case Status.ACCELERATE:
-                engine_force += 500  # 1000
+                engine_force += self.cart.handling['engine_force']
 
             case Status.DECELERATE:
-                brake_force += 50    # 100
+                brake_force += self.cart.handling['brake_force']
 
             case Status.BACK:
-                engine_force -= 500  # 1000
+                engine_force -= self.cart.handling['engine_force']
 
         # Apply engine and brake to rear wheels
         self.cart.apply_engine_and_brake(engine_force, brake_force)
@@ -229,4 +303,29 @@ class CartController:
     def detect_collision(self, target):
         if base.world.contact_test_pair(
                 target.node(), self.cart.node()).get_num_contacts() > 0:
-            return True
\ No newline at end of file
+            return True
+
+    def is_on_road(self, margin=0.05):
+        """Return True if all of the wheels rest on the road.
+           The ground object of the raycast info is not the node hit by the wheel,
+           so the ray of each wheel is cast again to its contact point.
+        """
+        mask = Layer.TERRAIN.mask | Layer.WATER.mask | Layer.ROAD.mask
+
+        for wheel in self.cart.vehicle.get_wheels():
+            info = wheel.get_raycast_info()
+            if not info.is_in_contact():
+                return False
+
+            end = info.get_contact_point_ws() + info.get_wheel_direction_ws() * margin
+            result = base.world.ray_test_closest(info.get_hard_point_ws(), end, mask)
+            if not result.has_hit() or get_layer(result.get_node()) != Layer.ROAD:
+                return False
+
+        return True
+
+    def detect_grounding(self, terrain):
+        return terrain.is_under_ground(self.cart.get_check_points())
+
+    def detect_submersion(self, water_surface):
+        return water_surface.is_under_water(self.cart.get_check_points())
\ No newline at end of file
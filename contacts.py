@@ -0,0 +1,85 @@
+"""Game events made from the bullet contact events.
+   Bullet throws bullet-contact-added only when a contact point with the terrain,
+   the water or the road appears, because only they notify collisions.
+"""
+from collections import deque
+from enum import Enum, auto
+
+from direct.showbase.DirectObject import DirectObject
+
+from layers import Layer, get_layer
+
+
+class Contact(Enum):
+
+    GAME_OVER = auto()
+    BAGGAGE_DROPPED = auto()
+
+
+class ContactMonitor(DirectObject):
+    """Queue the game events until the state machine drains them.
+       The cart touching the terrain or the water ends the game,
+       and a baggage touching the terrain, the water or the road is dropped.
+       The names of the dropped baggages are kept in the order they dropped,
+       to tell which part of the stack was lost, e.g. in the headless results.
+    """
+
+    GROUNDS = (Layer.TERRAIN, Layer.WATER)
+    FLOORS = (Layer.TERRAIN, Layer.WATER, Layer.ROAD)
+
+    def __init__(self):
+        self.events = deque()
+        self.dropped = set()
+        self.dropped_names = []
+        self.accept('bullet-contact-added', self.on_contact_added)
+
+    def reset(self):
+        """Forget the events and the dropped baggages of the last round."""
+        self.events.clear()
+        self.dropped.clear()
+        self.dropped_names.clear()
+
+    def on_contact_added(self, node0, node1):
+        for node, other in [(node0, node1), (node1, node0)]:
+            match get_layer(node):
+
+                case Layer.CART:
+                    if get_layer(other) in self.GROUNDS:
+                        self.events.append((Contact.GAME_OVER, node))
+
+                case Layer.BAGGAGE:
+                    if node not in self.dropped and get_layer(other) in self.FLOORS:
+                        self.dropped.add(node)
+                        self.events.append((Contact.BAGGAGE_DROPPED, node))
+
+    def drain(self):
+        while self.events:
+            yield self.events.popleft()
+
+    def check_game_over(self, controller, scene):
+        """Drain the events, and return True if the cart has touched the terrain or the water.
+           The wheels are rays and make no contact events, and the collision mesh of the water is flat,
+           so the wheels and the body corners are also checked against the terrain and the waves,
+           but only while any of the wheels is off the road; the terrain and the waves are below the road,
+           so the cart cannot touch them while all of the wheels rest on it.
+        """
+        game_over = False
+
+        for event, node in self.drain():
+            match event:
+                case Contact.GAME_OVER:
+                    game_over = True
+                case Contact.BAGGAGE_DROPPED:
+                    self.dropped_names.append(node.get_name())
+
+        if game_over:
+            return True
+
+        if controller.is_on_road():
+            return False
+
+        return controller.detect_grounding(scene.terrain) or controller.detect_submersion(scene.water_surface)
+
+    @property
+    def dropped_count(self):
+        return len(self.dropped)
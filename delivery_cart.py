@@ -1,22 +1,35 @@
+import argparse
 import sys
+import time
 from enum import Enum, auto
 
-from panda3d.bullet import BulletWorld, BulletDebugNode
+from panda3d.bullet import BulletDebugNode
 from panda3d.core import Vec3, Point3
 from panda3d.core import NodePath
 from panda3d.core import load_prc_file_data
-from panda3d.core import TransparencyAttrib, AntialiasAttrib
-from direct.interval.IntervalGlobal import Sequence, Func
+from panda3d.core import AntialiasAttrib
 from direct.showbase.ShowBase import ShowBase
 from direct.showbase.ShowBaseGlobal import globalClock
 
 from cart import CartController, BulletCart
+from contacts import ContactMonitor
 from scene import Scene
 from baggage import Baggages
-from gui import LevelSelector, Caption
-
-
+from layers import create_world
+from physics import PhysicsScheduler
+from profiler import profiler
+from gui import LevelSelector, Caption, ProfilerOverlay
+from transition import CameraFader
+from replay import InputRecorder
+from assets import assets
+
+
+# The bits of the collide masks are the groups of the interaction matrix in layers.py,
+# and the contact events are thrown for the nodes notifying collisions (see contacts.py).
+# These must be set before a BulletWorld is made.
 load_prc_file_data("", """
+    bullet-filter-algorithm groups-mask
+    bullet-enable-contact-events true
     textures-power-2 none
     gl-coordinate-system default
     window-title Panda3D Delivery Cart
@@ -39,23 +52,34 @@ class Status(Enum):
 
 
 class DeliveryCart(ShowBase):
-
-    def __init__(self):
+    """The game.
+        Args:
+            water_shader (bool): If True, the water surface waves in the vertex shader.
+            instanced (bool): If True, all of the baggages are drawn in one call by hardware instancing.
+            tiled (bool): If True, the world is made of tiles streamed around the cart.
+            water_lod (bool): If True, the water surface is detailed only close to the camera; ignored if tiled.
+    """
+
+    def __init__(self, water_shader=False, instanced=False, tiled=False, water_lod=False):
+        # Load the assets in the background while opening the window.
+        assets.preload()
         super().__init__()
         self.disable_mouse()
         self.render.set_antialias(AntialiasAttrib.MAuto)
 
-        self.world = BulletWorld()
-        self.world.set_gravity(Vec3(0, 0, -9.81))
+        self.world = create_world()
+        self.physics = PhysicsScheduler(self.world)
 
         self.debug = self.render.attach_new_node(BulletDebugNode('debug'))
         self.world.set_debug_node(self.debug.node())
 
-        self.scene = Scene()
+        self.scene = Scene(water_shader=water_shader, tiled=tiled, water_lod=water_lod)
         self.scene.reparent_to(self.render)
 
-        cart = BulletCart()
+        # The cart is out of the initial view, so its textures are set when the camera moves to it.
+        cart = BulletCart(textures=False)
         self.controller = CartController(cart)
+        self.contacts = ContactMonitor()
         self.floater = NodePath('floater')
         self.floater.set_pos(Point3(0, 0, 2))
         self.floater.reparent_to(cart)
@@ -67,15 +91,25 @@ class DeliveryCart(ShowBase):
         self.camera.look_at(self.cam_initial_hpr)
         self.camera.reparent_to(self.render)
 
-        self.baggages = Baggages()
+        self.baggages = Baggages(instanced=instanced)
         self.selector = LevelSelector()
         self.caption = Caption()
+        self.profiler_overlay = ProfilerOverlay(profiler)
 
         self.state = Status.START
+        self.fader = CameraFader()
+        # ShowBase.recorder is the session recorder of the task loop, so this has another name.
+        self.input_recorder = InputRecorder()
         self.cam_faded = False
+        # The time and the number of the frames played in the round, which tune the shadows.
+        self.play_time = 0
+        self.play_frames = 0
 
         self.accept('escape', sys.exit)
         self.accept('d', self.toggle_debug)
+        self.accept('p', self.toggle_profiler)
+        self.accept('o', self.export_profile)
+        self.accept('r', self.input_recorder.save, ['replays/last_round.json'])
         self.taskMgr.add(self.update, 'update')
         # use sort parameter to prevent camera shaking.
         self.taskMgr.add(self.move_camera, "move_camera", sort=25)
@@ -86,6 +120,17 @@ class DeliveryCart(ShowBase):
         else:
             self.debug.hide()
 
+    def toggle_profiler(self):
+        profiler.toggle()
+
+        if profiler.enabled:
+            self.profiler_overlay.show_overlay()
+        else:
+            self.profiler_overlay.hide_overlay()
+
+    def export_profile(self):
+        profiler.export(time.strftime('profile_%Y%m%d_%H%M%S.csv'))
+
     def fade_camera(self, pos, look_at, duration=2.0):
         """Fade the currently viewed scene to another camera perspective.
             Args:
@@ -94,35 +139,7 @@ class DeliveryCart(ShowBase):
                 duration (float): Fade is done over a period of [duration] seconds.
         """
         self.cam_faded = False
-
-        props = self.win.get_properties()
-        size = props.get_size()
-        buffer = self.win.make_texture_buffer('tex_buffer', *size)
-        buffer.set_clear_color_active(True)
-        buffer.set_clear_color((0.5, 0.5, 0.5, 1))
-
-        temp_cam = self.make_camera(buffer)
-        temp_cam.node().get_lens().set_fov(90)
-        temp_cam.reparent_to(self.render)
-        temp_cam.set_pos(pos)
-        temp_cam.look_at(look_at)
-
-        card = buffer.get_texture_card()
-        card.reparent_to(self.render2d)
-        # Screens slowly changes, having afterimage (road).
-        card.set_transparency(TransparencyAttrib.M_alpha)
-        # Screens quickly changes, having no afterimage.
-        # card.set_transparency(TransparencyAttrib.M_multisample)
-
-        Sequence(
-            card.colorScaleInterval(duration, 1, 0, blendType='easeInOut'),
-            Func(self.camera.set_pos, pos),
-            Func(self.camera.look_at, look_at),
-            Func(card.remove_node),
-            Func(temp_cam.remove_node),
-            Func(self.graphicsEngine.remove_window, buffer),
-            Func(self.end_fade)
-        ).start()
+        self.fader.fade(pos, look_at, duration, self.end_fade)
 
     def end_fade(self):
         self.cam_faded = True
@@ -139,16 +156,19 @@ class DeliveryCart(ShowBase):
 
     def move_camera(self, task):
         if self.state == Status.PLAY:
-            pos = self.get_cam_pos()
-            self.camera.set_pos(pos)
-            self.camera.look_at(self.floater)
+            profiler.measure('move_camera', self.follow_cart)
 
+        # This is the last task in a frame.
+        profiler.end_frame()
         return task.cont
 
+    def follow_cart(self):
+        pos = self.get_cam_pos()
+        self.camera.set_pos(pos)
+        self.camera.look_at(self.floater)
+
     def check_collision(self):
-        if self.controller.detect_collision(self.scene.terrain) or \
-                self.controller.detect_collision(self.scene.water_surface):
-            return True
+        return self.contacts.check_game_over(self.controller, self.scene)
 
     def update(self, task):
         dt = globalClock.get_dt()
@@ -162,20 +182,27 @@ class DeliveryCart(ShowBase):
 
             case Status.FADE_CAMERA:
                 if not self.selector.appeared:
+                    self.controller.cart.set_textures()
                     self.fade_camera(self.get_cam_pos(), self.floater)
                     self.state = Status.LOAD_BAGGAGES
 
             case Status.LOAD_BAGGAGES:
                 if self.cam_faded:
                     self.baggages.load(self.selector.selected)
+                    self.contacts.reset()
+                    self.input_recorder.start(self.selector.selected)
+                    self.play_time = 0
+                    self.play_frames = 0
                     self.caption.show('Go!', wait=1.0)
                     self.state = Status.PLAY
 
             case Status.PLAY:
-                self.controller.update(dt)
-                self.scene.day_light.update(self.controller.cart)
+                self.input_recorder.update(self.controller, dt)
+                self.play_time += dt
+                self.play_frames += 1
+                profiler.measure('controller', self.controller.update, dt)
 
-                if self.check_collision():
+                if profiler.measure('check_collision', self.check_collision):
                     self.caption.show('Game Over', wait=1.0)
                     self.state = Status.GAME_OVER
 
@@ -186,6 +213,9 @@ class DeliveryCart(ShowBase):
 
             case Status.CLEAN_UP:
                 if self.cam_faded:
+                    # The frames played in the round pick the shadow map resolution of the next round.
+                    if self.play_frames:
+                        self.scene.tune_shadows(self.play_time / self.play_frames * 1000)
                     self.clean_up()
                     self.state = Status.START
 
@@ -194,10 +224,20 @@ class DeliveryCart(ShowBase):
                 self.state = Status.SELECT_LEVEL
 
         self.scene.update(task.time, self.controller.cart)
-        self.world.do_physics(dt)
+        profiler.measure('do_physics', self.physics.do_physics, dt)
+        profiler.measure('baggages', self.baggages.update, dt)
+        profiler.record('frame_time', dt * 1000)
         return task.cont
 
 
 if __name__ == '__main__':
-    app = DeliveryCart()
+    parser = argparse.ArgumentParser(description='Deliver the baggages on the cart.')
+    parser.add_argument('--water-shader', action='store_true', help='Wave the water surface in the vertex shader.')
+    parser.add_argument('--instanced', action='store_true', help='Draw the baggages by hardware instancing.')
+    parser.add_argument('--tiled', action='store_true', help='Stream the tiles of the world around the cart.')
+    parser.add_argument('--water-lod', action='store_true', help='Detail the water surface only close to the camera.')
+    args = parser.parse_args()
+
+    app = DeliveryCart(water_shader=args.water_shader, instanced=args.instanced, tiled=args.tiled,
+                       water_lod=args.water_lod)
     app.run()
\ No newline at end of file
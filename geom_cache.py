@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+from panda3d.core import NodePath
+
+
+class GeomCache:
+    """Keep the models made by the shapes makers, keyed by the maker and its parameters,
+       and hand out copies sharing the GeomVertexData instead of making the same vertices again.
+        Args:
+            max_size (int): The maximum number of the kept models; the least recently used one is evicted.
+    """
+
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_template(self, maker_cls, **params):
+        key = (maker_cls, tuple(sorted(params.items())))
+
+        if (template := self.templates.get(key)) is not None:
+            self.hits += 1
+            self.templates.move_to_end(key)
+            return template
+
+        self.misses += 1
+        template = maker_cls(**params).create()
+        self.templates[key] = template
+
+        while len(self.templates) > self.max_size:
+            self.templates.popitem(last=False)
+
+        return template
+
+    def create(self, maker_cls, **params):
+        """Return a copy of the model; the geoms are shared with the template."""
+        template = self.get_template(maker_cls, **params)
+        return template.copy_to(NodePath())
+
+    def clear(self):
+        self.templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+geom_cache = GeomCache()
@@ -6,6 +6,8 @@ from panda3d.core import CardMaker, LColor, Point3, Vec3
 from panda3d.core import NodePath, TextNode
 from panda3d.core import TransparencyAttrib
 
+from assets import assets
+
 
 class LevelSelector(DirectFrame):
 
@@ -32,7 +34,7 @@ class LevelSelector(DirectFrame):
         self.create_buttons(color_high, color_normal)
 
     def create_label(self, color, text):
-        font = base.loader.load_font('font/Candaral.ttf')
+        font = assets.font('font/Candaral.ttf')
 
         DirectLabel(
             parent=self,
@@ -60,7 +62,7 @@ class LevelSelector(DirectFrame):
         text_np.set_pos(text_pos)
 
     def create_buttons(self, color_high, color_normal):
-        font = base.loader.load_font('font/segoeui.ttf')
+        font = assets.font('font/segoeui.ttf')
         text_pos = Point3(0, 0, -0.03)
         btn_normal_color = LColor(1, 1, 1, 0.5)
         btn_high_color = LColor(1, 1, 1, 0.7)
@@ -116,7 +118,7 @@ class Caption:
         self.display_pos = Point3(0, 0, 0.8)
         self.start_color = LColor(1, 1, 1, 1)
         self.end_color = LColor(1, 1, 1, 0)
-        self.font = base.loader.load_font('font/Candaral.ttf')
+        self.font = assets.font('font/Candaral.ttf')
         self.ended = False
 
     def show(self, text, scale=0.2, wait=1.0, duration=1.0):
@@ -148,4 +150,40 @@ class Caption:
 
     def end(self, text_np):
         text_np.remove_node()
-        self.ended = True
\ No newline at end of file
+        self.ended = True
+
+
+class ProfilerOverlay(NodePath):
+    """Show the rolling percentiles of the frame stages on the top left of the screen."""
+
+    def __init__(self, profiler, interval=0.5):
+        super().__init__(TextNode('profiler_overlay'))
+        self.profiler = profiler
+        self.interval = interval
+
+        self.node().set_text_color(LColor(1, 1, 1, 1))
+        self.node().set_card_color(LColor(0, 0, 0, 0.5))
+        self.node().set_card_as_margin(0.5, 0.5, 0.5, 0.5)
+        self.node().set_text_scale(0.05)
+        self.set_pos(Point3(0.05, 0, -0.08))
+        self.set_transparency(TransparencyAttrib.MAlpha)
+
+    def show_overlay(self):
+        self.reparent_to(base.a2dTopLeft)
+        base.taskMgr.do_method_later(self.interval, self.refresh, 'refresh_profiler_overlay')
+
+    def hide_overlay(self):
+        base.taskMgr.remove('refresh_profiler_overlay')
+        self.detach_node()
+
+    def refresh(self, task):
+        lines = [f'{"stage":<18}{"p50":>9}{"p95":>9}{"p99":>9}']
+
+        for stage, (p50, p95, p99) in sorted(self.profiler.get_percentiles().items()):
+            if stage in self.profiler.counters:
+                lines.append(f'{stage:<18}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}')
+            else:
+                lines.append(f'{stage:<18}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f} ms')
+
+        self.node().set_text('\n'.join(lines))
+        return task.again
@@ -0,0 +1,194 @@
+"""Run scripted deliveries without a window, stepping the physics as fast as possible.
+
+    >python headless.py --deliveries 100 --level 4
+"""
+import argparse
+import time
+
+from direct.showbase.ShowBase import ShowBase
+from panda3d.core import load_prc_file_data
+
+from cart import CartController, BulletCart, Status
+from contacts import ContactMonitor
+from scene import Scene
+from baggage import Baggages
+from layers import create_world
+from physics import PhysicsScheduler
+
+
+# (seconds, steering status, driving status)
+# A short drive to measure the steps per second, which does not reach the end of the road.
+DEFAULT_SCRIPT = [
+    (2.0, None, Status.ACCELERATE),
+    (1.0, Status.TURN_LEFT, Status.ACCELERATE),
+    (1.0, Status.STOP_TURN, Status.DECELERATE),
+]
+
+
+class Simulation(ShowBase):
+    """DeliveryCart without the window, the gui and the camera work.
+        Args:
+            dt (float): The fixed time step of a frame.
+            freezing (bool): If True, the settled stack of the baggages is frozen into the cart.
+    """
+
+    def __init__(self, dt=1 / 60, freezing=False):
+        # The collision groups and the contact events, like DeliveryCart.
+        load_prc_file_data('', """
+            window-type none
+            audio-library-name null
+            bullet-filter-algorithm groups-mask
+            bullet-enable-contact-events true""")
+        super().__init__()
+        # No camera is made without a window, but the terrain needs a focal point.
+        if self.camera is None:
+            self.camera = self.render.attach_new_node('camera')
+
+        self.dt = dt
+        self.world = create_world()
+        self.physics = PhysicsScheduler(self.world)
+
+        self.scene = Scene()
+        cart = BulletCart()
+        self.controller = CartController(cart)
+        self.contacts = ContactMonitor()
+        self.baggages = Baggages(freezing=freezing)
+        self.total_steps = 0
+
+    def renew_world(self):
+        """Replace the BulletWorld with a new one having the scene and a new cart of the same handling.
+           Bullet keeps the broadphase pairs, the contact caches and the remainder of the time steps
+           in the world, and the vehicle is bound to its world, so each delivery gets its own world
+           to start from the same state as the first one.
+        """
+        old_cart = self.controller.cart
+        old_cart.remove_node()
+
+        self.world = create_world()
+        self.physics = PhysicsScheduler(self.world)
+
+        for body in (self.scene.terrain, self.scene.water_surface, self.scene.road):
+            self.world.attach(body.node())
+
+        self.controller = CartController(BulletCart(handling=old_cart.handling))
+        self.baggages.set_cart(self.controller.cart)
+
+    def reset(self, level):
+        self.baggages.clean_up()
+        self.renew_world()
+        self.baggages.load(level)
+        # Throw away the contact events of the last delivery.
+        self.eventMgr.doEvents()
+        self.contacts.reset()
+
+    def check_collision(self):
+        return self.contacts.check_game_over(self.controller, self.scene)
+
+    def count_baggages_on_cart(self):
+        cart = self.controller.cart
+        count = 0
+
+        for baggage in self.baggages.root_np.get_children():
+            pos = baggage.get_pos(cart)
+            if abs(pos.x) <= cart.size.x / 2 and abs(pos.y) <= cart.size.y / 2 and pos.z > 0:
+                count += 1
+
+        return count
+
+    def step(self, sim_time):
+        self.controller.update(self.dt)
+        self.scene.update(sim_time, self.controller.cart)
+        self.physics.do_physics(self.dt)
+        # No task loop runs, so the contact events are sent to the monitor here.
+        self.eventMgr.doEvents()
+        self.baggages.update(self.dt)
+        self.total_steps += 1
+
+    def run_delivery(self, script=DEFAULT_SCRIPT, level=1, settle_time=1.0):
+        """Drive the cart by the script and return the result as dict.
+           The delivery ends when the game is over, or when the cart reaches the column at the end of the road;
+           lap_time is the seconds from the end of settle_time to reaching it, or None if not reached.
+           dropped_baggages is the names of the baggages which touched the floor, in the order they dropped.
+            Args:
+                script (list): The list of (seconds, steering status, driving status).
+                level (int): The number of the stack layers of the baggages.
+                settle_time (float): Seconds to let the baggages settle before driving.
+        """
+        self.reset(level)
+        sim_time = 0
+        steps = 0
+        game_over = False
+        lap_time = None
+        physics_ms = 0
+        max_roll = 0
+        start_pos = self.controller.cart.get_pos()
+        segments = [(settle_time, None, None)] + list(script)
+
+        for seconds, steering_state, driving_state in segments:
+            self.controller.monitor_key(steering_state, True)
+            self.controller.monitor_key(driving_state, False)
+
+            for _ in range(round(seconds / self.dt)):
+                self.step(sim_time)
+                sim_time += self.dt
+                steps += 1
+                physics_ms += self.physics.physics_ms
+                max_roll = max(max_roll, abs(self.controller.cart.get_r(self.render)))
+
+                if self.check_collision():
+                    game_over = True
+                    break
+
+                if self.scene.road.is_on_column(self.controller.cart.get_pos(self.render)):
+                    lap_time = sim_time - settle_time
+                    break
+
+            if game_over or lap_time is not None:
+                break
+
+        cart_pos = self.controller.cart.get_pos()
+
+        return dict(
+            level=level,
+            steps=steps,
+            sim_time=sim_time,
+            physics_ms=physics_ms,
+            game_over=game_over,
+            lap_time=lap_time,
+            max_roll=max_roll,
+            distance=(cart_pos - start_pos).length(),
+            cart_pos=tuple(round(v, 3) for v in cart_pos),
+            baggages=self.baggages.root_np.get_num_children(),
+            baggages_on_cart=self.count_baggages_on_cart(),
+            baggages_dropped=self.contacts.dropped_count,
+            dropped_baggages=list(self.contacts.dropped_names),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run scripted deliveries without a window.')
+    parser.add_argument('--deliveries', type=int, default=10)
+    parser.add_argument('--level', type=int, default=1, choices=range(1, 5))
+    parser.add_argument('--freeze', action='store_true', help='Freeze the settled stack into the cart.')
+    args = parser.parse_args()
+
+    sim = Simulation(freezing=args.freeze)
+    start = time.perf_counter()
+    game_overs = 0
+    lost = 0
+    dropped = 0
+
+    for _ in range(args.deliveries):
+        result = sim.run_delivery(level=args.level)
+        game_overs += result['game_over']
+        lost += result['baggages'] - result['baggages_on_cart']
+        dropped += result['baggages_dropped']
+
+    elapsed = time.perf_counter() - start
+    print(f'{args.deliveries} deliveries at level {args.level}: '
+          f'{game_overs} game overs, {lost} baggages lost, {dropped} dropped')
+    print(f'{sim.total_steps} steps in {elapsed:.2f} s, {sim.total_steps / elapsed:.0f} steps per second')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Collision layers shared by the rigid bodies.
+   A node belongs to a layer by the bit of the layer in its collide mask,
+   and the BulletWorld collides only the layers paired in INTERACTIONS.
+   The static pieces of the world are never paired with each other.
+   The groups are the bits of the collide masks only with bullet-filter-algorithm groups-mask,
+   which the apps set in their prc data before a BulletWorld is made.
+"""
+from enum import IntEnum
+from itertools import combinations_with_replacement
+
+from panda3d.bullet import BulletWorld
+from panda3d.core import BitMask32, Vec3
+
+
+class Layer(IntEnum):
+
+    TERRAIN = 0
+    WATER = 1
+    ROAD = 2
+    CART = 3
+    BAGGAGE = 4
+
+    @property
+    def mask(self):
+        return BitMask32.bit(self)
+
+
+INTERACTIONS = {
+    Layer.CART: (Layer.TERRAIN, Layer.WATER, Layer.ROAD, Layer.BAGGAGE),
+    Layer.BAGGAGE: (Layer.TERRAIN, Layer.WATER, Layer.ROAD, Layer.BAGGAGE),
+}
+
+# Every layer collides with every layer, like all of the nodes having the same mask.
+ALL_INTERACTIONS = {layer: tuple(Layer) for layer in Layer}
+
+
+def get_layer(node):
+    """Return the layer of the node, or None if the node is not in a single layer."""
+    mask = node.get_into_collide_mask()
+
+    if mask.get_num_on_bits() == 1 and (bit := mask.get_lowest_on_bit()) < len(Layer):
+        return Layer(bit)
+
+
+def collides(a, b, interactions=INTERACTIONS):
+    return b in interactions.get(a, ()) or a in interactions.get(b, ())
+
+
+def set_interactions(world, interactions=INTERACTIONS):
+    """Apply the interaction matrix to the world.
+       The pairs which have already been found by the broadphase are kept until they separate.
+    """
+    for a, b in combinations_with_replacement(Layer, 2):
+        world.set_group_collision_flag(a, b, collides(a, b, interactions))
+
+
+def create_world(interactions=INTERACTIONS):
+    world = BulletWorld()
+    world.set_gravity(Vec3(0, 0, -9.81))
+    set_interactions(world, interactions)
+    return world
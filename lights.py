@@ -1,6 +1,11 @@
+import time
+
 from panda3d.core import AmbientLight, DirectionalLight
 from panda3d.core import NodePath, PandaNode
-from panda3d.core import Vec3, Point3
+from panda3d.core import Vec2, Vec3, Point3
+from panda3d.core import ConfigVariableInt, PythonCallbackObject
+
+from profiler import profiler
 
 
 class BasicAmbientLight(NodePath):
@@ -12,17 +17,42 @@ class BasicAmbientLight(NodePath):
         base.render.set_light(self)
 
 
+SHADOW_TIERS = (1024, 2048, 4096)
+
+shadow_map_size = ConfigVariableInt(
+    'shadow-map-size', 0,
+    'The size of the shadow map of the day light, 1024, 2048 or 4096. '
+    '0 starts at 4096 and picks the tier from the frame time.')
+
+
 class BasicDayLight(NodePath):
+    """The directional light casting the shadows around the target.
+       The light moves in whole texels of the shadow map so that the shadows do not swim,
+       and only when the target leaves the margin around the center of the film.
+        Args:
+            film_size (tuple): The width and depth of the area casting shadows.
+            size (int): The size of the shadow map. If None, the shadow-map-size config is used.
+            margin (float): How far the target moves before the light follows it.
+    """
 
-    def __init__(self):
+    def __init__(self, film_size=(20, 40), size=None, margin=2):
         super().__init__(DirectionalLight('directional_light'))
-        self.node().get_lens().set_film_size(20, 40)
+        self.film_size = film_size
+        self.margin = margin
+        self.auto_size = size is None and shadow_map_size.get_value() == 0
+        self.moved = True
+        self.buffer = None
+        # The rounds in which the tiers went over the budget.
+        self.over_budget = {}
+        self.rounds = 0
+
+        self.node().get_lens().set_film_size(*film_size)
         self.node().get_lens().set_near_far(1, 100)
 
         self.node().set_color((1, 1, 1, 1))
         self.set_pos_hpr(Point3(0, 0, 40), Vec3(0, -90, 0))
         # self.node().set_shadow_caster(True, 8192, 8192)
-        self.node().set_shadow_caster(True, 4096, 4096)
+        self.set_shadow_size(size or shadow_map_size.get_value() or SHADOW_TIERS[-1])
 
         state = self.node().get_initial_state()
         temp = NodePath(PandaNode('temp_np'))
@@ -35,6 +65,68 @@ class BasicDayLight(NodePath):
         self.reparent_to(base.render)
         # self.node().show_frustum()
 
+    def set_shadow_size(self, size):
+        self.size = size
+        self.node().set_shadow_caster(True, size, size)
+        # The light looks straight down, so the film x and y are the world x and y.
+        self.texel = Vec2(self.film_size[0] / size, self.film_size[1] / size)
+        self.moved = True
+
+    def tune(self, frame_ms, budget_ms=1000 / 60, headroom=1.1, retry_rounds=5):
+        """Pick the tier of the next round by the mean frame time of the frames played in the round.
+           Under vsync the frame time stays at the budget however light the frames are, so the tier
+           steps down only if the frames are over the budget by more than the headroom, and steps
+           back up unless the upper tier went over the budget within the last retry_rounds rounds.
+           Call this between rounds, because the buffer is remade.
+        """
+        if not self.auto_size:
+            return
+
+        self.rounds += 1
+        idx = SHADOW_TIERS.index(self.size)
+
+        if frame_ms > budget_ms * headroom:
+            self.over_budget[self.size] = self.rounds
+
+            if idx > 0:
+                self.set_shadow_size(SHADOW_TIERS[idx - 1])
+        elif idx < len(SHADOW_TIERS) - 1:
+            upper = SHADOW_TIERS[idx + 1]
+
+            if self.rounds - self.over_budget.get(upper, -retry_rounds) >= retry_rounds:
+                self.set_shadow_size(upper)
+
     def update(self, target):
-        self.set_x(target.get_x())
-        self.set_y(target.get_y())
\ No newline at end of file
+        pos = target.get_pos(base.render)
+        x, y = self.get_x(), self.get_y()
+        self.moved = False
+
+        if abs(pos.x - x) > self.margin or abs(pos.y - y) > self.margin:
+            self.set_x(round(pos.x / self.texel.x) * self.texel.x)
+            self.set_y(round(pos.y / self.texel.y) * self.texel.y)
+            self.moved = True
+
+        self.watch_shadow_pass()
+
+    def watch_shadow_pass(self):
+        """Time the shadow pass by the draw callbacks of the display regions of the shadow buffer,
+           which is made lazily and remade with the size. This is the CPU time issuing the draw calls;
+           the GPU time is not included.
+        """
+        if base.win is None:
+            return
+
+        if (buffer := self.node().get_shadow_buffer(base.win.get_gsg())) is None or buffer == self.buffer:
+            return
+
+        self.buffer = buffer
+        callback = PythonCallbackObject(self.draw_shadow_pass)
+
+        for i in range(buffer.get_num_display_regions()):
+            buffer.get_display_region(i).set_draw_callback(callback)
+
+    def draw_shadow_pass(self, cbdata):
+        start = time.perf_counter()
+        cbdata.upcall()
+        # The frames are rendered after the profiler ends them, so this goes into the next frame.
+        profiler.record('shadow_pass', (time.perf_counter() - start) * 1000)
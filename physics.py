@@ -0,0 +1,30 @@
+import time
+
+
+class PhysicsScheduler:
+    """Step the world by the fixed time step, whatever the frame rate is.
+       Bullet carries the remainder of dt shorter than a step over to the next frame,
+       and synchronizes the nodes with the transforms interpolated by the remainder,
+       so rendering is smooth and the simulation does not depend on the frame rate.
+        Args:
+            world (BulletWorld): The world to be stepped.
+            step (float): The fixed time step in seconds.
+            max_substeps (int): The maximum number of steps in a frame;
+                                time over max_substeps * step is dropped.
+    """
+
+    def __init__(self, world, step=1 / 120, max_substeps=8):
+        self.world = world
+        self.step = step
+        self.max_substeps = max_substeps
+
+        self.num_steps = 0
+        self.physics_ms = 0
+        self.dropped_time = 0
+
+    def do_physics(self, dt):
+        start = time.perf_counter()
+        self.num_steps = self.world.do_physics(dt, self.max_substeps, self.step)
+        self.physics_ms = (time.perf_counter() - start) * 1000
+        self.dropped_time += max(0, dt - self.max_substeps * self.step)
+        return self.num_steps
@@ -0,0 +1,88 @@
+import csv
+import json
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+class FrameProfiler:
+    """Time the stages of a frame and keep rolling percentiles of them.
+       While disabled, measure only calls the function, so the overhead is nearly zero.
+        Args:
+            window (int): The number of the latest frames used for percentiles.
+            max_trace (int): The maximum number of the frames kept for export.
+    """
+
+    def __init__(self, window=300, max_trace=36000):
+        self.enabled = False
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.trace = deque(maxlen=max_trace)
+        self.frame = 0
+        self.current = {}
+        # The stages recorded by count, which are not milliseconds.
+        self.counters = set()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+        if not self.enabled:
+            self.end_frame()
+
+    def measure(self, stage, func, *args):
+        if not self.enabled:
+            return func(*args)
+
+        start = time.perf_counter()
+        result = func(*args)
+        ms = (time.perf_counter() - start) * 1000
+        self.current[stage] = self.current.get(stage, 0) + ms
+        return result
+
+    def record(self, stage, ms):
+        if self.enabled:
+            self.current[stage] = self.current.get(stage, 0) + ms
+
+    def count(self, stage, value):
+        """Record a value other than milliseconds in this frame, like the number of the triangles."""
+        if self.enabled:
+            self.current[stage] = value
+            self.counters.add(stage)
+
+    def end_frame(self):
+        if self.current:
+            for stage, ms in self.current.items():
+                self.samples[stage].append(ms)
+
+            self.trace.append(dict(frame=self.frame, **self.current))
+            self.current = {}
+
+        self.frame += 1
+
+    def get_percentiles(self, percentiles=(50, 95, 99)):
+        """Return {stage: [ms, ...]} of the percentiles over the latest frames."""
+        return {
+            stage: np.percentile(samples, percentiles).tolist()
+            for stage, samples in self.samples.items() if samples
+        }
+
+    def clear(self):
+        self.samples.clear()
+        self.trace.clear()
+        self.current = {}
+
+    def export(self, path):
+        """Write the trace to path as json, or csv if the path ends with .csv."""
+        stages = sorted({stage for row in self.trace for stage in row if stage != 'frame'})
+
+        with open(path, 'w', newline='') as f:
+            if str(path).endswith('.csv'):
+                writer = csv.DictWriter(f, fieldnames=['frame', *stages])
+                writer.writeheader()
+                writer.writerows(self.trace)
+            else:
+                json.dump(dict(stages=stages, frames=list(self.trace)), f)
+
+
+profiler = FrameProfiler()
@@ -0,0 +1,111 @@
+"""Record the control states of a round and replay them without a window.
+   Every run starts in a new Bullet world, so the repeated runs give the same result.
+
+    >python replay.py replays/last_round.json --repeat 5
+"""
+import argparse
+import json
+import pathlib
+import time
+
+from cart import Status
+
+
+class InputRecorder:
+    """Record the control states of CartController with the time they changed, and the level."""
+
+    def __init__(self):
+        self.start(None)
+
+    def start(self, level):
+        self.level = level
+        self.events = []
+        self.time = 0
+
+    def update(self, controller, dt):
+        """Call this every frame before CartController.update."""
+        states = (controller.steering_state, controller.driving_state)
+
+        if not self.events or self.events[-1][1:] != states:
+            self.events.append((self.time, *states))
+
+        self.time += dt
+
+    def save(self, path):
+        """Write the recorded round to the path, and return True.
+           Nothing is written and False is returned if no round has been recorded.
+        """
+        if self.level is None or not self.events:
+            return False
+
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = dict(
+            level=self.level,
+            duration=round(self.time, 4),
+            events=[[round(t, 4), self.get_name(steering), self.get_name(driving)]
+                    for t, steering, driving in self.events]
+        )
+
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+        return True
+
+    @staticmethod
+    def get_name(status):
+        return None if status is None else status.name
+
+
+def load_recording(path):
+    """Return the level and the script of (seconds, steering status, driving status)
+       which headless.Simulation.run_delivery takes.
+       Raise ValueError if the file has no recorded round.
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    if data.get('level') is None or not data.get('events') or data.get('duration', 0) <= 0:
+        raise ValueError(f'{path} has no recorded round.')
+
+    events = data['events']
+    ends = [t for t, *_ in events[1:]] + [data['duration']]
+    script = [
+        (end - t,
+         None if steering is None else Status[steering],
+         None if driving is None else Status[driving])
+        for (t, steering, driving), end in zip(events, ends)
+    ]
+    return data['level'], script
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded round without a window.')
+    parser.add_argument('path', help='The recorded file.')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--dt', type=float, default=1 / 60)
+    args = parser.parse_args()
+
+    from headless import Simulation
+
+    try:
+        level, script = load_recording(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sim = Simulation(dt=args.dt)
+
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        result = sim.run_delivery(script, level, settle_time=0)
+        elapsed = time.perf_counter() - start
+        steps = max(result['steps'], 1)
+
+        print(f'run {i}: {result["steps"] / elapsed:.0f} steps per second, '
+              f'physics {result["physics_ms"] / steps:.3f} ms per step, '
+              f'game over {result["game_over"]}, cart at {result["cart_pos"]}, '
+              f'baggages on cart {result["baggages_on_cart"]}/{result["baggages"]}')
+
+
+if __name__ == '__main__':
+    main()
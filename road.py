@@ -0,0 +1,139 @@
+import numpy as np
+
+from panda3d.core import Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat
+
+
+def winding_center_line(segs_x, seg, radius, segs_a=20):
+    """Return the (N, 3) center line of the winding road; half circles centered on the x axis
+       at seg intervals, alternately on the positive and the negative side of y.
+        Args:
+            segs_x (int): The number of the half circles.
+            seg (float): The distance between the centers of the half circles.
+            radius (float): The radius of the half circles.
+            segs_a (int): The number of the segments of a half circle.
+    """
+    i = np.arange(segs_x)[:, np.newaxis]
+    side = np.where(i % 2 == 0, 1, -1)
+    # From pi to 0 on the positive side, and from pi to 2pi on the negative side.
+    angles = np.pi - side * np.linspace(0, np.pi, segs_a + 1)
+    x = seg * i + radius * np.cos(angles)
+    y = radius * np.sin(angles)
+
+    # The half circles after the first one start at the end of the previous one.
+    x = np.concatenate([x[0], x[1:, 1:].ravel()])
+    y = np.concatenate([y[0], y[1:, 1:].ravel()])
+    return np.stack([x, y, np.zeros_like(x)], axis=1)
+
+
+class RoadMaker:
+    """Make the road geom by sweeping a rectangular cross section along a center line.
+       The vertices, the normals, the uvs and the indices of all of the rings are computed
+       by numpy at once, and written into one GeomVertexData and one GeomTriangles sized beforehand.
+       The u of the uvs runs along the road in road widths, so the texture keeps its aspect,
+       and the v runs across each side from 0 to 1.
+        Args:
+            width (float): The width of the road.
+            thickness (float): The thickness of the road, above the center line.
+    """
+
+    def __init__(self, width=6, thickness=1):
+        self.width = width
+        self.thickness = thickness
+
+    def get_frames(self, points):
+        """Return the unit forward, right and up vectors at the points.
+           The right vectors are horizontal. Where the road goes straight up or down, the right vector
+           of the nearest point before it (or after it at the beginning) which does not is used,
+           so that the road does not twist; if the whole road is vertical, the x axis is used.
+        """
+        forward = np.gradient(points, axis=0)
+        length = np.linalg.norm(forward, axis=1, keepdims=True)
+
+        if not length.all():
+            raise ValueError('The center line has no direction at some points; remove the repeated points.')
+
+        forward /= length
+        right = np.cross(forward, (0, 0, 1))
+        vertical = np.linalg.norm(right, axis=1) < 1e-6
+
+        if vertical.all():
+            right[:] = (1, 0, 0)
+        elif vertical.any():
+            idx = np.maximum.accumulate(np.where(vertical, -1, np.arange(len(points))))
+            idx[idx < 0] = np.argmin(vertical)
+            right[vertical] = right[idx[vertical]]
+
+        right /= np.linalg.norm(right, axis=1, keepdims=True)
+        up = np.cross(right, forward)
+        return forward, right, up
+
+    def get_sides(self, points, right, up, dist):
+        """Return the vertex rows of the four sides; (4, N, 2, 8) float32 array."""
+        half = right * self.width / 2
+        top = points + up * self.thickness
+        # The corners of the cross section, clockwise seen from behind.
+        corners = np.stack([top - half, top + half, points + half, points - half])
+        normals = np.stack([up, right, -up, -right])
+
+        n = len(points)
+        rows = np.empty((4, n, 2, 8), dtype=np.float32)
+
+        for i in range(4):
+            rows[i, :, 0, :3] = corners[i]
+            rows[i, :, 1, :3] = corners[(i + 1) % 4]
+            rows[i, :, :, 3:6] = normals[i][:, np.newaxis]
+
+        rows[:, :, :, 6] = (dist / self.width)[:, np.newaxis]
+        rows[:, :, 0, 7] = 0
+        rows[:, :, 1, 7] = 1
+        return rows
+
+    def get_caps(self, sides, forward):
+        """Return the vertex rows of the caps at both ends; (2, 4, 8) float32 array."""
+        caps = np.empty((2, 4, 8), dtype=np.float32)
+        caps[0, :, :3] = sides[:, 0, 0, :3][::-1]
+        caps[0, :, 3:6] = -forward[0]
+        caps[1, :, :3] = sides[:, -1, 0, :3]
+        caps[1, :, 3:6] = forward[-1]
+        caps[:, :, 6:] = [[0, 0], [1, 0], [1, 1], [0, 1]]
+        return caps
+
+    def get_indices(self, n):
+        """Return the indices of the triangles of the sides and the caps."""
+        # The first vertex of the quads between the ring k and k + 1 of each side.
+        starts = (np.arange(4)[:, np.newaxis] * n + np.arange(n - 1)) * 2
+        starts = starts.ravel()[:, np.newaxis]
+        quads = starts + [1, 3, 2, 1, 2, 0]
+
+        caps = 8 * n + np.array([[0, 1, 2, 0, 2, 3], [4, 5, 6, 4, 6, 7]])
+        return np.concatenate([quads.ravel(), caps.ravel()]).astype(np.uint32)
+
+    def get_geom_node(self, points, name='road'):
+        """Args:
+            points (array_like): The (N, 3) points of the center line; N >= 2.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        forward, right, up = self.get_frames(points)
+        dist = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+
+        sides = self.get_sides(points, right, up, dist)
+        caps = self.get_caps(sides, forward)
+        indices = self.get_indices(len(points))
+
+        vdata = GeomVertexData(name, GeomVertexFormat.get_v3n3t2(), Geom.UH_static)
+        vdata.unclean_set_num_rows(sides.size // 8 + caps.size // 8)
+        view = np.frombuffer(memoryview(vdata.modify_array(0)), dtype=np.float32).reshape(-1, 8)
+        view[:sides.size // 8] = sides.reshape(-1, 8)
+        view[sides.size // 8:] = caps.reshape(-1, 8)
+
+        prim = GeomTriangles(Geom.UH_static)
+        prim.set_index_type(Geom.NT_uint32)
+        arr = prim.modify_vertices()
+        arr.unclean_set_num_rows(len(indices))
+        np.frombuffer(memoryview(arr), dtype=np.uint32)[:] = indices
+
+        geom = Geom(vdata)
+        geom.add_primitive(prim)
+        node = GeomNode(name)
+        node.add_geom(geom)
+        return node
@@ -1,24 +1,34 @@
-import math
+import queue
+import threading
 
 from panda3d.bullet import BulletRigidBodyNode
 from panda3d.bullet import BulletTriangleMeshShape, BulletHeightfieldShape, ZUp
 from panda3d.bullet import BulletConvexHullShape, BulletTriangleMesh
 from panda3d.core import NodePath, PandaNode
-from panda3d.core import BitMask32, Vec3, Point3, LColor
-from panda3d.core import Filename, PNMImage
-from panda3d.core import GeoMipTerrain
+from panda3d.core import Vec3, Point3, LColor, BoundingBox
+from panda3d.core import Filename, PNMImage, Texture
+from panda3d.core import GeoMipTerrain, GeomVertexReader
 from panda3d.core import Shader, TextureStage, TransformState
-from panda3d.core import TransparencyAttrib
+from panda3d.core import TransparencyAttrib, TexGenAttrib
+
+import numpy as np
 
 from shapes import Cylinder, Plane
 from lights import BasicAmbientLight, BasicDayLight
+from asset_cache import asset_cache
+from geom_cache import geom_cache
+from layers import Layer
+from road import RoadMaker, winding_center_line
+from assets import assets
+from profiler import profiler
+from water import WaveEngine, wave_height
 
 
 class Sky(NodePath):
 
     def __init__(self):
         super().__init__(PandaNode('sky'))
-        model = base.loader.load_model('models/blue-sky/blue-sky-sphere')
+        model = assets.model('models/blue-sky/blue-sky-sphere')
         model.set_color(LColor(2, 2, 2, 1))
         model.set_scale(0.2)
         model.set_z(0)
@@ -27,38 +37,59 @@ class Sky(NodePath):
 
 
 class Terrain(NodePath):
-
-    def __init__(self, heightmap_path, height=100):
+    """Args:
+            heightmap (str or PNMImage): The path to the heightmap image, or the image itself.
+            height (float): The scale of the heightmap.
+            block_size (int): The size of GeoMipTerrain blocks; the unit of the LOD.
+            min_level (int): The minimum level of detail; 0 is the highest.
+            near (float): The distance within which the blocks have the highest detail.
+            far (float): The distance beyond which the blocks have the lowest detail.
+            heights (numpy.ndarray): The heights of the heightmap by load_heights;
+                                     made from the heightmap if None.
+            chunks (int): The number of the GeoMipTerrains along a side, which are generated one by one;
+                          the heightmap size - 1 and the texture scales must be divisible by it.
+            deferred (bool): If True, the chunks are not generated until generate_chunks is iterated.
+    """
+
+    def __init__(self, heightmap, height=100, block_size=8, min_level=2, near=40, far=100, heights=None,
+                 chunks=1, deferred=False):
         super().__init__(BulletRigidBodyNode('terrain'))
         self.height = height
+        self.block_size = block_size
+        self.min_level = min_level
+        self.near = near
+        self.far = far
+        self.focal_point = base.camera
+
         self.node().set_mass(0)
-        self.set_collide_mask(BitMask32.bit(1))
-        self.create_terrain(heightmap_path)
+        self.set_collide_mask(Layer.TERRAIN.mask)
+        self.node().notify_collisions(True)
+        self.create_terrain(heightmap, heights, chunks)
 
-    def create_terrain(self, heightmap_path):
-        img = PNMImage(Filename(heightmap_path))
+        if not deferred:
+            for _ in self.generate_chunks():
+                pass
+
+    def create_terrain(self, heightmap, heights=None, chunks=1):
+        img = heightmap if isinstance(heightmap, PNMImage) else PNMImage(Filename(heightmap))
         shape = BulletHeightfieldShape(img, self.height, ZUp)
         shape.set_use_diamond_subdivision(True)
         self.node().add_shape(shape)
 
-        self.terrain = GeoMipTerrain('geomip_terrain')
-        self.terrain.set_heightfield(heightmap_path)
-        self.terrain.set_border_stitching(True)
-        self.terrain.set_block_size(8)
-        self.terrain.set_min_level(2)
-        self.terrain.set_focal_point(base.camera)
-
         size_x, size_y = img.get_size()
         x = (size_x - 1) / 2
         y = (size_y - 1) / 2
+        self.origin = Point3(-x, -y, -(self.height / 2))
+        self.heights = self.load_heights(img, self.height) if heights is None else heights
 
-        pos = Point3(-x, -y, -(self.height / 2))
         scale = Vec3(1, 1, self.height)
-        self.root = self.terrain.get_root()
+        self.root = self.attach_new_node('terrain_root')
         self.root.set_scale(scale)
-        self.root.set_pos(pos)
-        self.terrain.generate()
-        self.root.reparent_to(self)
+        self.root.set_pos(self.origin)
+
+        chunk_size = (size_x - 1) // chunks
+        self.chunks = [self.create_chunk(img, i * chunk_size, j * chunk_size, chunk_size)
+                       for j in range(chunks) for i in range(chunks)]
 
         shader = Shader.load(Shader.SL_GLSL, 'shaders/terrain_v.glsl', 'shaders/terrain_f.glsl')
         self.root.set_shader(shader)
@@ -71,60 +102,436 @@ class Terrain(NodePath):
         for i, (file_name, tex_scale) in enumerate(tex_files):
             ts = TextureStage(f'ts{i}')
             ts.set_sort(i)
-            self.root.set_shader_input(f'tex_ScaleFactor{i}', tex_scale)
-            tex = base.loader.load_texture(f'textures/{file_name}')
+            # The texcoords of GeoMipTerrain go from 0 to 1 over each chunk.
+            self.root.set_shader_input(f'tex_ScaleFactor{i}', tex_scale / chunks)
+            tex = assets.texture(f'textures/{file_name}')
             self.root.set_texture(ts, tex)
 
+    def create_chunk(self, img, x, y, size):
+        """Return the GeoMipTerrain of the square of the heightmap whose top left pixel is (x, y).
+           The neighbouring chunks share the pixels on their edges, and the border stitching
+           keeps the edges of the chunks at the same level of detail.
+        """
+        chunk_img = PNMImage(size + 1, size + 1, img.get_num_channels(), img.get_maxval())
+        chunk_img.copy_sub_image(img, 0, 0, x, y, size + 1, size + 1)
+
+        terrain = GeoMipTerrain('geomip_terrain')
+        terrain.set_heightfield(chunk_img)
+        terrain.set_border_stitching(True)
+        terrain.set_block_size(self.block_size)
+        terrain.set_min_level(self.min_level)
+        terrain.set_near_far(self.near, self.far)
+        terrain.set_focal_point(self.focal_point)
+        # y of GeoMipTerrain goes up from the bottom of the image.
+        terrain.get_root().set_pos(x, img.get_y_size() - 1 - y - size, 0)
+        terrain.get_root().reparent_to(self.root)
+        return terrain
+
+    def generate_chunks(self):
+        """Generate the chunks, yielding after each one, so that a caller can spread them over frames."""
+        for chunk in self.chunks:
+            chunk.generate()
+            yield
+
+    def update_lod(self):
+        """Update the level of detail of the chunks, and return True if any of them changed."""
+        return any([chunk.update() for chunk in self.chunks])
+
+    def count_triangles(self):
+        return sum(
+            geom.get_primitive(i).get_num_faces()
+            for geom_np in self.root.find_all_matches('**/+GeomNode')
+            for geom in geom_np.node().get_geoms()
+            for i in range(geom.get_num_primitives())
+        )
 
-class WaterSurface(NodePath):
-
-    def __init__(self, w=256, d=256, segs_w=16, segs_d=16):
-        super().__init__(BulletRigidBodyNode('water_surface'))
-        plane = Plane(w, d, segs_w, segs_d)
-        self.stride = plane.stride
+    @staticmethod
+    def load_heights(img, height):
+        """Return the heights of the heightmap as (rows, cols) array, scaled by the height.
+           Rows of the texture ram image go from the bottom of the image,
+           which is the same as y of GeoMipTerrain.
+        """
+        tex = Texture()
+        tex.load(img)
+        dtype = np.uint16 if tex.get_component_width() == 2 else np.uint8
+        arr = np.frombuffer(tex.get_ram_image_as('RGB'), dtype=dtype)
+        arr = arr.reshape(img.get_y_size(), img.get_x_size(), 3)
+        return arr.mean(axis=2) / img.get_maxval() * height
+
+    def sample(self, xs, ys):
+        """Return the four heights around the points and the fractions between them."""
+        rows, cols = self.heights.shape
+        gx = np.clip(np.asarray(xs, dtype=np.float64) - self.origin.x, 0, cols - 1)
+        gy = np.clip(np.asarray(ys, dtype=np.float64) - self.origin.y, 0, rows - 1)
+        x0 = np.minimum(gx.astype(np.intp), cols - 2)
+        y0 = np.minimum(gy.astype(np.intp), rows - 2)
+        fx = gx - x0
+        fy = gy - y0
+
+        h00 = self.heights[y0, x0]
+        h10 = self.heights[y0, x0 + 1]
+        h01 = self.heights[y0 + 1, x0]
+        h11 = self.heights[y0 + 1, x0 + 1]
+        return h00, h10, h01, h11, fx, fy
+
+    def get_heights(self, xs, ys):
+        """Return the bilinearly interpolated heights at the points (xs, ys)
+           in the terrain's coordinate space. Points outside the terrain are clamped to the edge.
+        """
+        h00, h10, h01, h11, fx, fy = self.sample(xs, ys)
+        h0 = h00 + (h10 - h00) * fx
+        h1 = h01 + (h11 - h01) * fx
+        return h0 + (h1 - h0) * fy + self.origin.z
+
+    def get_normals(self, xs, ys):
+        """Return the unit normals of the bilinear surface at the points (xs, ys) as (N, 3) array."""
+        h00, h10, h01, h11, fx, fy = self.sample(xs, ys)
+        dx = (h10 - h00) * (1 - fy) + (h11 - h01) * fy
+        dy = (h01 - h00) * (1 - fx) + (h11 - h10) * fx
+        normals = np.stack([-dx, -dy, np.ones_like(dx)], axis=-1)
+        return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+    def get_height(self, x, y):
+        return float(self.get_heights(x, y))
+
+    def get_normal(self, x, y):
+        return Vec3(*self.get_normals(x, y))
+
+    def is_under_ground(self, points, margin=0.05):
+        """Return True if any of the points are lower than the terrain surface plus margin.
+            Args:
+                points (list of Point3): The positions relative to render.
+        """
+        mat = base.render.get_mat(self)
+        pts = [mat.xform_point(pt) for pt in points]
+        heights = self.get_heights([pt.x for pt in pts], [pt.y for pt in pts])
+        return any(pt.z < h + margin for pt, h in zip(pts, heights))
+
+
+class TerrainLOD:
+    """Update the level of detail of the terrain, only when the focal point
+       has moved farther than threshold since the last update.
+        Args:
+            terrain (Terrain): The terrain to be updated.
+            threshold (float): The distance the focal point must move to update.
+    """
+
+    def __init__(self, terrain, threshold=4):
+        self.terrain = terrain
+        self.threshold = threshold
+        self.last_pos = None
+        self.num_updates = 0
+        self._num_triangles = None
+
+    @property
+    def num_triangles(self):
+        """The number of the triangles of the current level of detail,
+           counted only when asked after the level of detail changed.
+        """
+        if self._num_triangles is None:
+            self._num_triangles = self.terrain.count_triangles()
+
+        return self._num_triangles
+
+    def update(self):
+        pos = self.terrain.focal_point.get_pos(self.terrain)
+
+        if self.last_pos is not None and (pos - self.last_pos).length() < self.threshold:
+            return False
+
+        self.last_pos = pos
+
+        if self.terrain.update_lod():
+            self.num_updates += 1
+            self._num_triangles = None
+            return True
+
+        return False
+
+
+class WavingWater(NodePath):
+    """The height queries of the water surfaces waving by water.wave_height."""
+
+    def get_height(self, x, y):
+        """Return the height of the current water surface at (x, y) in this node's coordinate space."""
+        return wave_height(x + self.offset[0], y + self.offset[1], self.time, self.wave_h)
+
+    def is_under_water(self, points):
+        """Return True if any of the points are lower than the current water surface.
+            Args:
+                points (list of Point3): The positions relative to render.
+        """
+        mat = base.render.get_mat(self)
+
+        for pt in points:
+            pt = mat.xform_point(pt)
+            if pt.z < self.get_height(pt.x, pt.y):
+                return True
+
+        return False
+
+
+class WaterSurface(WavingWater):
+    """Waving water surface.
+        Args:
+            use_shader (bool): If True, the waves are made in the vertex shader
+                               instead of modifying the vertices on CPU every frame.
+            collision_mesh (bool): If False, the triangle mesh shape is not added;
+                                   baggages fall through the water then.
+    """
+
+    def __init__(self, w=256, d=256, segs_w=16, segs_d=16, use_shader=False, collision_mesh=True):
+        params = dict(w=w, d=d, segs_w=segs_w, segs_d=segs_d, collision_mesh=collision_mesh)
+
+        if (node := asset_cache.load('water_surface', params)) is not None:
+            super().__init__(node)
+            self.model = self.get_child(0)
+        else:
+            super().__init__(BulletRigidBodyNode('water_surface'))
+            self.create_surface(w, d, segs_w, segs_d, collision_mesh)
+            asset_cache.save('water_surface', params, self)
+
+        vdata = self.model.node().get_geom(0).get_vertex_data()
+        self.stride = vdata.get_array(0).get_array_format().get_stride() // 4
+        self.use_shader = use_shader
+        self.time = 0
+        self.wave_h = 3.0
+        self.offset = (0, 0)
 
-        self.model = plane.create()
         self.model.set_transparency(TransparencyAttrib.MAlpha)
-        self.model.set_texture(base.loader.loadTexture('textures/water.png'))
+        self.model.set_texture(assets.texture('textures/water.png'))
+        self.node().set_mass(0)
+        self.set_collide_mask(Layer.WATER.mask)
+        self.node().notify_collisions(True)
+        self.set_shader_off()
+
+        if self.use_shader:
+            shader = Shader.load(Shader.SL_GLSL, 'shaders/water_v.glsl', 'shaders/water_f.glsl')
+            self.model.set_shader(shader)
+            self.model.set_shader_input('time', 0.0)
+            self.model.set_shader_input('wave_h', 3.0)
+            self.model.set_shader_input('offset', self.offset)
+        else:
+            self.wave_engine = WaveEngine(self.model.node(), self.stride)
+
+    def create_surface(self, w, d, segs_w, segs_d, collision_mesh):
+        self.model = Plane(w, d, segs_w, segs_d).create()
         self.model.set_pos(0, 0, 0)
         self.model.reparent_to(self)
 
-        mesh = BulletTriangleMesh()
-        mesh.add_geom(self.model.node().get_geom(0))
-        shape = BulletTriangleMeshShape(mesh, dynamic=False)
-        self.node().add_shape(shape)
+        if collision_mesh:
+            mesh = BulletTriangleMesh()
+            mesh.add_geom(self.model.node().get_geom(0))
+            shape = BulletTriangleMeshShape(mesh, dynamic=False)
+            self.node().add_shape(shape)
+
+    def set_offset(self, x, y):
+        """Offset the waves by (x, y), so that the surfaces placed side by side wave seamlessly."""
+        self.offset = (x, y)
+
+        if self.use_shader:
+            self.model.set_shader_input('offset', self.offset)
+        else:
+            self.wave_engine.set_offset(x, y)
+
+    def wave(self, time, wave_h=3.0):
+        self.time = time
+        self.wave_h = wave_h
+
+        if self.use_shader:
+            self.model.set_shader_input('time', time)
+            self.model.set_shader_input('wave_h', wave_h)
+            return
+
+        if wave_h != self.wave_engine.wave_h:
+            self.wave_engine.set_wave_h(wave_h)
+
+        self.wave_engine.wave(time)
+
+
+class WaterTile(NodePath):
+    """A square Plane of a level of WaterClipmap, waved by its own WaveEngine."""
+
+    def __init__(self, size, segs):
+        model = Plane(size, size, segs, segs).create()
+        super().__init__(model.node())
+        vdata = self.node().get_geom(0).get_vertex_data()
+        stride = vdata.get_array(0).get_array_format().get_stride() // 4
+        self.size = size
+        self.wave_engine = WaveEngine(self.node(), stride)
+        self.bounds = None
+
+    def set_bounds(self, wave_h):
+        """Make the box the waves of the tile stay in, relative to the grid."""
+        pos = self.get_pos()
+        half = self.size / 2
+        self.bounds = BoundingBox(Point3(pos.x - half, pos.y - half, -wave_h),
+                                  Point3(pos.x + half, pos.y + half, wave_h))
+
+
+class WaterClipmap(WavingWater):
+    """Waving water surface made of the nested square rings of Plane tiles centered on the camera.
+       The cells of each level are twice as large as those of the inner level,
+       so the waves are detailed only close up. The grid shifts in whole cells of the outermost level,
+       and only the tiles in the view of the camera are waved.
+        Args:
+            levels (int): The number of the levels.
+            cells (int): The number of the cells along a side of a level; a multiple of 8.
+            cell_size (float): The size of the cells of the innermost level.
+            w (float): The width of the flat collision mesh.
+            d (float): The depth of the flat collision mesh.
+    """
+
+    def __init__(self, levels=4, cells=32, cell_size=1, w=256, d=256, collision_mesh=True):
+        super().__init__(BulletRigidBodyNode('water_surface'))
+        self.focal_point = base.camera
+        self.step = cell_size * 2 ** (levels - 1)
+        self.time = 0
+        self.wave_h = 3.0
+        self.offset = (0, 0)
+        self.waved_vertices = 0
+
+        self.grid = self.attach_new_node('water_grid')
+        self.grid.set_transparency(TransparencyAttrib.MAlpha)
+        self.grid.set_texture(assets.texture('textures/water.png'))
+        # The tiles have their own uvs, so the texture is put by the world position
+        # to stretch over w x d like the one Plane.
+        self.grid.set_tex_gen(TextureStage.get_default(), TexGenAttrib.M_world_position)
+        self.grid.set_tex_scale(TextureStage.get_default(), 1 / w, 1 / d)
+        self.grid.set_tex_offset(TextureStage.get_default(), 0.5, 0.5)
+        self.tiles = []
+        self.create_tiles(levels, cells, cell_size)
+
+        if collision_mesh:
+            # The collision mesh is flat, so it does not need the detail of the tiles.
+            mesh = BulletTriangleMesh()
+            mesh.add_geom(Plane(w, d, 16, 16).create().node().get_geom(0))
+            self.node().add_shape(BulletTriangleMeshShape(mesh, dynamic=False))
 
         self.node().set_mass(0)
-        self.set_collide_mask(BitMask32.bit(1))
+        self.set_collide_mask(Layer.WATER.mask)
+        self.node().notify_collisions(True)
         self.set_shader_off()
+        self.move_grid(Point3(0, 0, 0))
+
+    def create_tiles(self, levels, cells, cell_size):
+        for level in range(levels):
+            size = cells * cell_size * 2 ** level
+            tile_size = size / 4
+            # The innermost level is filled; the others are rings around the inner level.
+            blocks = [(i, j) for i in range(4) for j in range(4)
+                      if level == 0 or not (i in (1, 2) and j in (1, 2))]
+
+            for i, j in blocks:
+                tile = WaterTile(tile_size, cells // 4)
+                tile.set_pos(-size / 2 + tile_size * (i + 0.5), -size / 2 + tile_size * (j + 0.5), 0)
+                tile.reparent_to(self.grid)
+                tile.set_bounds(self.wave_h)
+
+                if level < levels - 1:
+                    self.stitch(tile, size, cell_size * 2 ** level)
+
+                self.tiles.append(tile)
+
+    def stitch(self, tile, level_size, cell):
+        """Find the vertices between the vertices of the coarser level on the outer edges of the level."""
+        view = tile.wave_engine.get_vertex_view()
+        xs = view[:, 0] + tile.get_x()
+        ys = view[:, 1] + tile.get_y()
+        keys = {(round(x / cell), round(y / cell)): i for i, (x, y) in enumerate(zip(xs, ys))}
+        half = round(level_size / 2 / cell)
+        vertices = []
+        ends = []
+
+        for (x, y), i in keys.items():
+            if abs(x) == half and y % 2:
+                vertices.append(i)
+                ends.append((keys[(x, y - 1)], keys[(x, y + 1)]))
+            elif abs(y) == half and x % 2:
+                vertices.append(i)
+                ends.append((keys[(x - 1, y)], keys[(x + 1, y)]))
+
+        tile.wave_engine.set_stitches(np.array(vertices, dtype=np.int64), np.array(ends, dtype=np.int64))
+
+    def move_grid(self, center):
+        """Put the grid on the center, and wave the tiles as the parts of one surface."""
+        self.grid.set_pos(center)
+
+        for tile in self.tiles:
+            pos = tile.get_pos() + center
+            tile.wave_engine.set_offset(pos.x + self.offset[0], pos.y + self.offset[1])
+
+    def follow(self):
+        pos = self.focal_point.get_pos(self)
+        x = round(pos.x / self.step) * self.step
+        y = round(pos.y / self.step) * self.step
+
+        if x != self.grid.get_x() or y != self.grid.get_y():
+            self.move_grid(Point3(x, y, 0))
+
+    def get_visible_tiles(self):
+        if base.camLens is None:
+            return self.tiles
+
+        frustum = base.camLens.make_bounds()
+        frustum.xform(base.cam.get_mat(self.grid))
+
+        return [tile for tile in self.tiles if frustum.contains(tile.bounds)]
+
+    def set_offset(self, x, y):
+        """Offset the waves by (x, y), so that the surfaces placed side by side wave seamlessly."""
+        self.offset = (x, y)
+        self.move_grid(self.grid.get_pos())
 
     def wave(self, time, wave_h=3.0):
-        geom_node = self.model.node()
-        geom = geom_node.modify_geom(0)
-        vdata = geom.modify_vertex_data()
-        vdata_arr = vdata.modify_array(0)
-        vdata_mem = memoryview(vdata_arr).cast('B').cast('f')
+        if wave_h != self.wave_h:
+            for tile in self.tiles:
+                tile.set_bounds(wave_h)
 
-        for i in range(0, len(vdata_mem), self.stride):
-            x, y = vdata_mem[i: i + 2]
-            z = (math.sin(time + x / wave_h) + math.sin(time + y / wave_h)) * wave_h / 2
-            # z = (math.sin(time + x / wave_h) + math.sin(y + x) / wave_h) * wave_h / 2
-            vdata_mem[i + 2] = z
+        self.time = time
+        self.wave_h = wave_h
+        self.follow()
+        self.waved_vertices = 0
 
+        for tile in self.get_visible_tiles():
+            if wave_h != tile.wave_engine.wave_h:
+                tile.wave_engine.set_wave_h(wave_h)
+
+            tile.wave_engine.wave(time)
+            self.waved_vertices += len(tile.wave_engine.x_terms)
 
-class Road(NodePath):
 
-    def __init__(self, segs_x=4, size=256, height=20, col_radius=4, road_width=6):
-        super().__init__(BulletRigidBodyNode('cylinder'))
+class Road(NodePath):
+    """Winding road made of half rings between two columns.
+        Args:
+            segs_x (int): The number of the half rings.
+            segs_a (int): The number of the segments of each half ring.
+            convex_pieces (int): If given, the collision shape of each half ring is
+                                 this number of convex pieces instead of the triangle mesh.
+            columns (tuple of int): The ends with a column; -1 is the start and 1 is the goal.
+    """
+
+    def __init__(self, segs_x=4, size=256, height=20, col_radius=4, road_width=6, convex_pieces=None, segs_a=20,
+                 columns=(-1, 1)):
+        params = dict(segs_x=segs_x, size=size, height=height, col_radius=col_radius,
+                      road_width=road_width, convex_pieces=convex_pieces, segs_a=segs_a, columns=columns)
         self.size = size - col_radius * 2
         self.height = height
+        self.col_radius = col_radius
+
+        if (node := asset_cache.load('road', params)) is not None:
+            super().__init__(node)
+        else:
+            super().__init__(BulletRigidBodyNode('cylinder'))
+            self.create_columns(col_radius, columns)
+            self.create_road(segs_x, road_width, convex_pieces, segs_a)
+            asset_cache.save('road', params, self)
 
-        self.create_columns(col_radius)
-        self.create_road(segs_x, road_width)
-        self.set_texture(base.loader.load_texture('textures/concrete_01.jpg'))
+        self.set_texture(assets.texture('textures/concrete_01.jpg'))
 
         self.node().set_mass(0)
-        self.set_collide_mask(BitMask32.bit(1))
+        self.set_collide_mask(Layer.ROAD.mask)
+        self.node().notify_collisions(True)
 
     def get_start_location(self, direction=-1):
         x = self.size / 2 * direction
@@ -134,14 +541,19 @@ class Road(NodePath):
 
         return start_pos, start_hpr
 
-    def create_columns(self, col_radius):
-        model_maker = Cylinder(
-            radius=col_radius, height=self.height, segs_a=10)
+    def is_on_column(self, pos, direction=1):
+        """Return True if pos relative to render is above the top of the column on the direction;
+           the column at the other end of the road from the start location is the goal.
+        """
+        col_pos, _ = self.get_start_location(direction)
+        return (pos.xy - col_pos.xy).length() < self.col_radius and pos.z > col_pos.z - 1
+
+    def create_columns(self, col_radius, columns):
         x = self.size / 2
 
-        for direction in [-1, 1]:
+        for direction in columns:
             pos = Point3(x * direction, 0, 0)
-            model = model_maker.create()
+            model = geom_cache.create(Cylinder, radius=col_radius, height=self.height, segs_a=10)
             model.set_pos(pos)
             model.reparent_to(self)
 
@@ -149,57 +561,302 @@ class Road(NodePath):
             shape.add_geom(model.node().get_geom(0))
             self.node().add_shape(shape, TransformState.make_pos(pos))
 
-    def create_road(self, segs_x, road_width):
+    def create_road(self, segs_x, road_width, convex_pieces=None, segs_a=20):
         seg = self.size / segs_x
         radius = seg / 2 + 3
         inner_radius = radius - road_width
 
-        model_maker = Cylinder(
-            radius=radius,
-            inner_radius=inner_radius,
-            ring_slice_deg=180,
-            height=1,
-        )
-
-        for i in range(segs_x):
-            if i == 0:
-                geom_node = model_maker.get_geom_node()
-                continue
-
-            new_geom_node = model_maker.get_geom_node()
-            rotation_deg = 0 if i % 2 == 0 else 180
-            bottom_center = Point3(seg * i, 0, 0)
-            model_maker.merge_geom(geom_node, new_geom_node, Vec3(0, 0, 1), bottom_center, rotation_deg)
+        # All of the half rings are swept at once, instead of merging them one by one.
+        points = winding_center_line(segs_x, seg, radius - road_width / 2, segs_a)
+        geom_node = RoadMaker(width=road_width, thickness=1).get_geom_node(points)
 
         pos = Point3(-self.size / 2 + seg - seg / 2, 0, self.height - 1.001)
-        model = model_maker.modeling(geom_node)
+        model = NodePath(geom_node)
         model.set_pos(pos)
-        model.set_tex_scale(TextureStage.get_default(), 5, 3)
         model.reparent_to(self)
 
+        if convex_pieces:
+            centers = [Point3(seg * i, 0, 0) for i in range(segs_x)]
+            self.create_convex_pieces(
+                model.node().get_geom(0), centers, inner_radius, radius, convex_pieces, pos)
+            return
+
         # If using BulletConvexHullShape, hollow is lost because of the shape.
         mesh = BulletTriangleMesh()
         mesh.add_geom(model.node().get_geom(0))
         shape = BulletTriangleMeshShape(mesh, dynamic=False)
         self.node().add_shape(shape, TransformState.make_pos(pos))
 
+    def create_convex_pieces(self, geom, centers, inner_radius, radius, pieces, pos):
+        """Approximate each half ring by convex prisms of the annular sectors,
+           keeping the hollow which a convex hull of the whole ring loses.
+           The half rings are joined on the x axis, so each one is on either side of it;
+           the side is found from the vertices.
+        """
+        reader = GeomVertexReader(geom.get_vertex_data(), 'vertex')
+        vertices = []
+        while not reader.is_at_end():
+            vertices.append(tuple(reader.get_data3()))
+
+        vertices = np.array(vertices)
+        z_min, z_max = vertices[:, 2].min(), vertices[:, 2].max()
+        ts = TransformState.make_pos(pos)
+
+        for center in centers:
+            rel = vertices[:, :2] - (center.x, center.y)
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+            on_ring = (dist > inner_radius - 0.01) & (dist < radius + 0.01)
+            upper = np.count_nonzero(rel[on_ring, 1] > 0.01) > np.count_nonzero(rel[on_ring, 1] < -0.01)
+            start = 0 if upper else np.pi
+
+            for i in range(pieces):
+                shape = BulletConvexHullShape()
+
+                for angle in (start + np.pi * i / pieces, start + np.pi * (i + 1) / pieces):
+                    for r in (inner_radius, radius):
+                        for z in (z_min, z_max):
+                            x = center.x + r * np.cos(angle)
+                            y = center.y + r * np.sin(angle)
+                            shape.add_point(Point3(x, y, z))
+
+                self.node().add_shape(shape, ts)
+
+
+class Tile(NodePath):
+    """A square of the tiled world; the terrain, the water surface and the road.
+       The road spans the tile from edge to edge, so that its half rings go on into those
+       of the next tile; the road of the start tile begins at the start column on its west edge.
+        Args:
+            heightmap (tuple): The heightmap image and its heights by TiledWorld.load_heightmap.
+            tile_size (float): The size of a tile.
+            height (float): The scale of the heightmap.
+            road (str): 'start' for the road from the start column, 'road' for the road only, or None.
+            water_shader (bool): Passed to WaterSurface.
+            chunks (int): Passed to Terrain.
+            deferred (bool): Passed to Terrain.
+    """
+
+    def __init__(self, heightmap, tile_size, height=100, road=None, water_shader=False, chunks=1, deferred=False):
+        super().__init__(PandaNode('tile'))
+        self.key = None
+        img, heights = heightmap
+
+        self.terrain = Terrain(img, height=height, heights=heights, chunks=chunks, deferred=deferred)
+        self.terrain.reparent_to(self)
+        self.terrain_lod = TerrainLOD(self.terrain)
 
-class Scene(NodePath):
+        self.water_surface = WaterSurface(use_shader=water_shader)
+        self.water_surface.reparent_to(self)
 
-    def __init__(self):
+        self.road = None
+        if road is not None:
+            col_radius = 4
+            columns = (-1,) if road == 'start' else ()
+            self.road = Road(size=tile_size + col_radius * 2, col_radius=col_radius, columns=columns)
+            self.road.set_pos(0, 0, 1)
+            self.road.reparent_to(self)
+
+    def get_bodies(self):
+        return [body for body in (self.terrain, self.water_surface, self.road) if body is not None]
+
+    def attach(self, parent, key, tile_size):
+        self.key = key
+        self.set_pos(key[0] * tile_size, key[1] * tile_size, 0)
+        self.reparent_to(parent)
+        self.water_surface.set_offset(self.get_x(), self.get_y())
+
+        for body in self.get_bodies():
+            base.world.attach(body.node())
+
+    def detach(self):
+        for body in self.get_bodies():
+            base.world.remove(body.node())
+
+        self.detach_node()
+        self.key = None
+
+
+class TiledWorld(NodePath):
+    """Attach the tiles in a ring around the cart as it drives, and detach the tiles
+       which fall behind into the pools to be reused, so that the number of the nodes
+       and the rigid bodies stays constant. The road runs east from the start tile along the tiles of y == 0.
+       The heightmap is mirrored on the tiles of odd x and odd y, so that neighbouring tiles have
+       the same heights on their shared edges; the tiles are pooled by the mirroring and the road.
+       The heightmaps of new tiles are loaded on a background thread, which uses only the images
+       and numpy; the nodes are made of them on the main thread in update, over a frame for the tile
+       and one more for each chunk of its terrain. GeoMipTerrain.generate holds the GIL,
+       so it would stall the main thread on the background thread too.
+        Args:
+            tile_size (float): The size of a tile; the same as the heightmap size - 1.
+            radius (int): The number of the tiles around the center tile attached.
+            water_shader (bool): Passed to WaterSurface.
+            heightmap_path (str): The path to the heightmap image.
+            height (float): The scale of the heightmap.
+            chunks (int): The number of the chunks along a side of the terrain of a tile.
+    """
+
+    def __init__(self, tile_size=256, radius=1, water_shader=False, heightmap_path='terrains/heightmap.png',
+                 height=100, chunks=2):
+        super().__init__(PandaNode('tiled_world'))
+        self.tile_size = tile_size
+        self.radius = radius
+        self.water_shader = water_shader
+        self.heightmap = PNMImage(Filename(heightmap_path))
+        self.height = height
+        self.chunks = chunks
+
+        self.tiles = {}
+        self.pools = {}
+        self.requested = set()
+        self.building = None
+        self.load_queue = queue.Queue()
+        self.loaded_queue = queue.Queue()
+
+        self.worker = threading.Thread(target=self.load_heightmaps, daemon=True)
+        self.worker.start()
+
+    def get_key(self, pos):
+        return round(pos.x / self.tile_size), round(pos.y / self.tile_size)
+
+    def get_wanted_keys(self, center):
+        cx, cy = center
+        r = self.radius
+        return {(cx + i, cy + j) for i in range(-r, r + 1) for j in range(-r, r + 1)}
+
+    def get_road(self, key):
+        if key[1] != 0 or key[0] < 0:
+            return None
+
+        return 'start' if key[0] == 0 else 'road'
+
+    def get_kind(self, key):
+        """Return the mirroring in x and y and the road of the tile, by which the tiles are pooled."""
+        return key[0] % 2 == 1, key[1] % 2 == 1, self.get_road(key)
+
+    def load_heightmap(self, key):
+        """Return the heightmap image mirrored for the tile and its heights."""
+        flip_x, flip_y, _ = self.get_kind(key)
+        img = PNMImage(self.heightmap)
+        img.flip(flip_x, flip_y, False)
+        return img, Terrain.load_heights(img, self.height)
+
+    def load_heightmaps(self):
+        while (key := self.load_queue.get()) is not None:
+            self.loaded_queue.put((key, self.load_heightmap(key)))
+
+    def create_tile(self, key, heightmap, deferred=False):
+        return Tile(heightmap, self.tile_size, self.height, self.get_road(key), self.water_shader,
+                    self.chunks, deferred)
+
+    def build_tile(self, key, heightmap):
+        """Make the tile a step each time this is resumed; this yields None
+           until the chunks of the terrain are generated, and then the key and the tile.
+        """
+        tile = self.create_tile(key, heightmap, deferred=True)
+        yield
+
+        for _ in tile.terrain.generate_chunks():
+            yield
+
+        yield key, tile
+
+    def attach_tile(self, tile, key):
+        tile.attach(self, key, self.tile_size)
+        self.tiles[key] = tile
+
+    def pool_tile(self, tile, key):
+        self.pools.setdefault(self.get_kind(key), []).append(tile)
+
+    def update(self, pos, wait=False):
+        """Attach and detach tiles around pos, and return the tile at pos.
+            Args:
+                pos (Point3): The position relative to this node.
+                wait (bool): If True, make the missing tiles on this thread.
+        """
+        center = self.get_key(pos)
+        wanted = self.get_wanted_keys(center)
+
+        for key in [key for key in self.tiles if key not in wanted]:
+            tile = self.tiles.pop(key)
+            tile.detach()
+            self.pool_tile(tile, key)
+
+        # Making the nodes of a tile takes tens of milliseconds, so a tile is made over frames.
+        if self.building is None and not self.loaded_queue.empty():
+            self.building = self.build_tile(*self.loaded_queue.get_nowait())
+
+        if self.building is not None and (built := next(self.building)) is not None:
+            self.building = None
+            key, tile = built
+            self.requested.discard(key)
+
+            if key in wanted and key not in self.tiles:
+                self.attach_tile(tile, key)
+            else:
+                self.pool_tile(tile, key)
+
+        for key in wanted - self.tiles.keys() - self.requested:
+            if pool := self.pools.get(self.get_kind(key)):
+                self.attach_tile(pool.pop(), key)
+            elif wait:
+                self.attach_tile(self.create_tile(key, self.load_heightmap(key)), key)
+            else:
+                self.requested.add(key)
+                self.load_queue.put(key)
+
+        # The terrain under the cart is needed at once by the collision checks,
+        # so the center tile is made on this thread if it is still pending.
+        if center not in self.tiles:
+            self.attach_tile(self.create_tile(center, self.load_heightmap(center)), center)
+
+        return self.tiles[center]
+
+    def shutdown(self):
+        self.load_queue.put(None)
+
+
+class Scene(NodePath):
+    """The whole world of the game.
+        Args:
+            water_shader (bool): If True, the water surface waves in the vertex shader.
+            tiled (bool): If True, the world is made of tiles streamed around the cart.
+            water_lod (bool): If True, the water surface is WaterClipmap; ignored if tiled.
+    """
+
+    def __init__(self, water_shader=False, tiled=False, water_lod=False):
         super().__init__(PandaNode('scene'))
         self.reparent_to(base.render)
         self.ambient_light = BasicAmbientLight()
         self.day_light = BasicDayLight()
         self.sky = Sky()
         self.sky.reparent_to(self)
-
+        self.tiled_world = None
+
+        if tiled:
+            self.create_tiled_world(water_shader)
+        else:
+            self.create_world(water_shader, water_lod)
+
+    def create_tiled_world(self, water_shader):
+        self.tiled_world = TiledWorld(water_shader=water_shader)
+        self.tiled_world.reparent_to(self)
+        tile = self.tiled_world.update(Point3(0, 0, 0), wait=True)
+        self.set_tile(tile)
+        # The start location is always on the road of the center tile.
+        self.road = tile.road
+
+    def create_world(self, water_shader, water_lod=False):
         self.terrain = Terrain('terrains/heightmap.png')
         self.terrain.reparent_to(self)
         self.terrain.set_pos(Point3(0, 0, 0))
         base.world.attach(self.terrain.node())
+        self.terrain_lod = TerrainLOD(self.terrain)
+
+        if water_lod:
+            self.water_surface = WaterClipmap()
+        else:
+            self.water_surface = WaterSurface(use_shader=water_shader)
 
-        self.water_surface = WaterSurface()
         self.water_surface.reparent_to(self)
         self.water_surface.set_pos(0, 0, 0)
         base.world.attach(self.water_surface.node())
@@ -209,6 +866,36 @@ class Scene(NodePath):
         self.road.reparent_to(self)
         base.world.attach(self.road.node())
 
+    def set_tile(self, tile):
+        """Make the tile's terrain and water surface the targets of the collision checks."""
+        self.terrain = tile.terrain
+        self.terrain_lod = tile.terrain_lod
+        self.water_surface = tile.water_surface
+
+    def update_tiles(self, task_time, shadow_target):
+        pos = shadow_target.get_pos(self.tiled_world)
+        self.sky.set_pos(pos.x, pos.y, 0)
+
+        self.set_tile(self.tiled_world.update(pos))
+
+        for tile in self.tiled_world.tiles.values():
+            tile.terrain_lod.update()
+            tile.water_surface.wave(task_time)
+
     def update(self, task_time, shadow_target):
-        self.water_surface.wave(task_time)
-        self.day_light.update(shadow_target)
\ No newline at end of file
+        if self.tiled_world is not None:
+            profiler.measure('tiles', self.update_tiles, task_time, shadow_target)
+            lods = [tile.terrain_lod for tile in self.tiled_world.tiles.values()]
+        else:
+            profiler.measure('terrain_lod', self.terrain_lod.update)
+            profiler.measure('wave', self.water_surface.wave, task_time)
+            lods = [self.terrain_lod]
+
+        if profiler.enabled:
+            profiler.count('terrain_triangles', sum(lod.num_triangles for lod in lods))
+
+        profiler.measure('day_light', self.day_light.update, shadow_target)
+
+    def tune_shadows(self, frame_ms):
+        """Pick the resolution tier of the shadow map by the frame time."""
+        self.day_light.tune(frame_ms)
\ No newline at end of file
@@ -0,0 +1,28 @@
+#version 330
+uniform sampler2D p3d_Texture0;
+
+uniform struct p3d_LightSourceParameters {
+    vec4 color;
+    vec4 position;
+    sampler2DShadow shadowMap;
+    mat4 shadowViewMatrix;
+} p3d_LightSource[1];
+
+uniform struct p3d_LightModelParameters {
+    vec4 ambient;
+} p3d_LightModel;
+
+in vec2 texcoord;
+in vec3 normal;
+in vec4 shadowcoord;
+
+out vec4 fragColor;
+
+void main() {
+    vec4 color = texture(p3d_Texture0, texcoord);
+    // The position of a directional light is its direction in view space.
+    float diffuse = max(dot(normalize(normal), normalize(p3d_LightSource[0].position.xyz)), 0.0);
+    float shadow = textureProj(p3d_LightSource[0].shadowMap, shadowcoord);
+    vec3 light = p3d_LightModel.ambient.rgb + p3d_LightSource[0].color.rgb * diffuse * shadow;
+    fragColor = vec4(color.rgb * light, color.a);
+}
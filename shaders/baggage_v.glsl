@@ -0,0 +1,37 @@
+#version 330
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform samplerBuffer transforms;
+
+uniform struct p3d_LightSourceParameters {
+    vec4 color;
+    vec4 position;
+    sampler2DShadow shadowMap;
+    mat4 shadowViewMatrix;
+} p3d_LightSource[1];
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec2 p3d_MultiTexCoord0;
+
+out vec2 texcoord;
+out vec3 normal;
+out vec4 shadowcoord;
+
+void main() {
+    // Four texels per instance, which are the rows of the panda3d matrix.
+    int i = gl_InstanceID * 4;
+    mat4 transform = mat4(
+        texelFetch(transforms, i),
+        texelFetch(transforms, i + 1),
+        texelFetch(transforms, i + 2),
+        texelFetch(transforms, i + 3)
+    );
+
+    vec4 vertex = transform * p3d_Vertex;
+    gl_Position = p3d_ModelViewProjectionMatrix * vertex;
+    texcoord = p3d_MultiTexCoord0;
+    normal = normalize(p3d_NormalMatrix * (mat3(transform) * p3d_Normal));
+    shadowcoord = p3d_LightSource[0].shadowViewMatrix * (p3d_ModelViewMatrix * vertex);
+}
@@ -0,0 +1,7 @@
+#version 330
+out vec4 fragColor;
+
+// Only the depth is used in the shadow pass.
+void main() {
+    fragColor = vec4(1.0);
+}
@@ -0,0 +1,23 @@
+#version 300 es
+precision highp float;
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform float time;
+uniform float wave_h;
+uniform vec2 offset;
+
+in vec4 p3d_Vertex;
+in vec2 p3d_MultiTexCoord0;
+
+out vec2 texcoord;
+
+// Must be the same as water.wave_height.
+float waveHeight(float x, float y){
+    return (sin(time + x / wave_h) + sin(time + y / wave_h)) * wave_h / 2.0;
+}
+
+void main() {
+    vec4 vertex = p3d_Vertex;
+    vertex.z = waveHeight(vertex.x + offset.x, vertex.y + offset.y);
+    gl_Position = p3d_ModelViewProjectionMatrix * vertex;
+    texcoord = p3d_MultiTexCoord0;
+}
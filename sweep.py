@@ -0,0 +1,133 @@
+"""Run the headless deliveries over a grid of the handling parameters in a process pool,
+   and print the results as a table.
+   Every case runs in a new process, so that its first delivery is reproducible.
+   The cart is driven by a recorded round, because the laps and the lap times are
+   only measured by a drive reaching the column at the end of the road.
+
+    >python sweep.py --grid friction_slip=50,100,200 suspension_stiffness=20,40 --replay replays/last_round.json
+    >python sweep.py --grid engine_force=300,500,700 --replay replays/last_round.json --workers 4
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cart import HANDLING
+from replay import load_recording
+
+
+COLUMNS = ['game_overs', 'lost', 'dropped', 'laps', 'lap_time', 'max_roll', 'distance', 'sim_time']
+
+
+def run_case(handling, script, level, deliveries, dt):
+    """Run the deliveries in the worker process and return the metrics of the case."""
+    from headless import Simulation
+
+    sim = Simulation(dt=dt)
+    sim.controller.cart.set_handling(handling)
+    results = [sim.run_delivery(script, level) for _ in range(deliveries)]
+    lap_times = [r['lap_time'] for r in results if r['lap_time'] is not None]
+
+    return dict(
+        game_overs=sum(r['game_over'] for r in results),
+        lost=sum(r['baggages'] - r['baggages_on_cart'] for r in results),
+        dropped=sum(r['baggages_dropped'] for r in results),
+        laps=len(lap_times),
+        lap_time=sum(lap_times) / len(lap_times) if lap_times else None,
+        max_roll=max(r['max_roll'] for r in results),
+        distance=sum(r['distance'] for r in results) / deliveries,
+        sim_time=sum(r['sim_time'] for r in results) / deliveries,
+    )
+
+
+def parse_grid(items):
+    """Return {name: [value, ...]} from the items like 'friction_slip=50,100'.
+       All of the handling parameters are given to Bullet as floats, so the values are parsed as floats.
+    """
+    grid = {}
+
+    for item in items:
+        name, _, values = item.partition('=')
+
+        if name not in HANDLING:
+            raise ValueError(f'{name} is not in {", ".join(HANDLING)}')
+
+        try:
+            grid[name] = [float(v) for v in values.split(',')]
+        except ValueError:
+            raise ValueError(f'{item} must be name=number,number,...')
+
+    return grid
+
+
+def sweep(grid, script, level, deliveries=1, dt=1 / 60, workers=None):
+    """Return (handling, metrics) of every combination in the grid.
+        Args:
+            script (list): The script of run_delivery, like the one of a recorded round.
+            level (int): The number of the stack layers of the baggages.
+    """
+    names = list(grid)
+    cases = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    # Panda3D does not survive fork, so the workers are spawned.
+    ctx = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(workers, mp_context=ctx, max_tasks_per_child=1) as executor:
+        futures = {executor.submit(run_case, case, script, level, deliveries, dt): case for case in cases}
+
+        return [(case, future.result()) for future, case in futures.items()]
+
+
+def print_table(names, rows):
+    header = names + COLUMNS
+    widths = [max(len(name), 10) for name in header]
+    print(' '.join(f'{name:>{w}}' for name, w in zip(header, widths)))
+
+    for handling, metrics in rows:
+        values = [handling[name] for name in names] + [metrics[col] for col in COLUMNS]
+        print(' '.join(f'{v:>{w}.3f}' if isinstance(v, float) else f'{"-" if v is None else v:>{w}}'
+                       for v, w in zip(values, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep the handling parameters of the cart.')
+    parser.add_argument('--grid', nargs='+', required=True, help='name=value,value,...')
+    parser.add_argument('--replay', required=True,
+                        help='Drive by the recorded round at its level; press [R] in the game to record one.')
+    parser.add_argument('--deliveries', type=int, default=1, help='The deliveries per case.')
+    parser.add_argument('--dt', type=float, default=1 / 60)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help='Write the table to the csv file too.')
+    args = parser.parse_args()
+
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        level, script = load_recording(args.replay)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    rows = sweep(grid, script, level, args.deliveries, args.dt, args.workers)
+    elapsed = time.perf_counter() - start
+
+    # The cases losing the fewest baggages come first, then the ones finishing more laps faster with the least roll.
+    rows.sort(key=lambda row: (row[1]['game_overs'], row[1]['lost'], -row[1]['laps'],
+                               row[1]['lap_time'] if row[1]['laps'] else float('inf'), row[1]['max_roll']))
+    print_table(list(grid), rows)
+    print(f'{len(rows)} cases in {elapsed:.1f} s with {args.workers} workers')
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(grid) + COLUMNS)
+            writer.writeheader()
+            writer.writerows({**handling, **metrics} for handling, metrics in rows)
+
+
+if __name__ == '__main__':
+    main()
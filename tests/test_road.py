@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from panda3d.core import NodePath
+
+from road import RoadMaker, winding_center_line
+
+
+@pytest.mark.parametrize('points', [
+    [[0, 0, 0], [0, 0, 5], [0, 0, 10], [3, 0, 12]],
+    [[0, 0, 0], [4, 0, 0], [4, 0, 5], [4, 0, 10], [8, 0, 10]],
+    [[0, 0, 0], [0, 0, 1], [0, 0, 2]],
+])
+def test_frames_of_vertical_center_line(points):
+    forward, right, up = RoadMaker().get_frames(np.array(points, dtype=np.float64))
+
+    for vectors in (forward, right, up):
+        assert not np.isnan(vectors).any()
+        assert np.linalg.norm(vectors, axis=1) == pytest.approx(1)
+
+    assert np.abs((forward * right).sum(axis=1)).max() == pytest.approx(0)
+    assert np.abs((right * up).sum(axis=1)).max() == pytest.approx(0)
+    # The road does not twist at the vertical points.
+    assert np.abs(np.diff(right, axis=0)).max() == pytest.approx(0)
+
+
+def test_slab_is_above_center_line():
+    points = winding_center_line(2, 20, 10)
+    node = RoadMaker(width=6, thickness=1).get_geom_node(points)
+    bottom, top = NodePath(node).get_tight_bounds()
+    assert bottom.z == pytest.approx(0)
+    assert top.z == pytest.approx(1)
+
+
+def test_repeated_points_are_rejected():
+    with pytest.raises(ValueError):
+        RoadMaker().get_frames(np.array([[0, 0, 0], [1, 0, 0], [1, 0, 0], [1, 0, 0], [2, 0, 0]], dtype=np.float64))
@@ -0,0 +1,50 @@
+import pathlib
+import re
+
+import numpy as np
+import pytest
+from panda3d.core import Geom, GeomNode, GeomVertexData, GeomVertexFormat
+
+from water import WaveEngine, wave_height
+
+
+SHADER = pathlib.Path(__file__).resolve().parents[1] / 'shaders' / 'water_v.glsl'
+
+
+def glsl_wave_height(x, y, time, wave_h):
+    """Evaluate the return expression of waveHeight in water_v.glsl by numpy in float32, like highp."""
+    source = SHADER.read_text()
+    body = re.search(r'float waveHeight\(float x, float y\)\s*\{\s*return (.+?);', source, re.S)
+    assert body, 'waveHeight is not found in water_v.glsl'
+    expr = re.sub(r'\bsin\(', 'np.sin(', body.group(1))
+    names = dict(np=np, x=np.float32(x), y=np.float32(y), time=np.float32(time), wave_h=np.float32(wave_h))
+    return eval(expr, names)
+
+
+@pytest.mark.parametrize('wave_h', [0.5, 3.0, 7.25])
+@pytest.mark.parametrize('time', [0.0, 1.7, 123.4])
+def test_wave_height_matches_shader(time, wave_h):
+    rng = np.random.default_rng(0)
+
+    for x, y in rng.uniform(-256, 256, size=(50, 2)):
+        assert wave_height(x, y, time, wave_h) == pytest.approx(
+            glsl_wave_height(x, y, time, wave_h), abs=1e-3)
+
+
+def test_wave_engine_matches_wave_height():
+    xs, ys = np.meshgrid(np.linspace(-128, 128, 9), np.linspace(-128, 128, 9))
+    vdata = GeomVertexData('plane', GeomVertexFormat.get_v3(), Geom.UH_static)
+    vdata.unclean_set_num_rows(xs.size)
+    view = np.frombuffer(memoryview(vdata.modify_array(0)), dtype=np.float32).reshape(-1, 3)
+    view[:, 0] = xs.ravel()
+    view[:, 1] = ys.ravel()
+    view[:, 2] = 0
+    node = GeomNode('plane')
+    node.add_geom(Geom(vdata))
+
+    engine = WaveEngine(node, 3, wave_h=2.0, offset=(10, -20))
+    engine.wave(4.5)
+    view = engine.get_vertex_view()
+
+    for x, y, z in view:
+        assert z == pytest.approx(wave_height(x + 10, y - 20, 4.5, 2.0), abs=1e-4)
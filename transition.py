@@ -0,0 +1,69 @@
+from direct.interval.IntervalGlobal import Sequence, Func
+from panda3d.core import TransparencyAttrib
+
+
+class CameraFader:
+    """Fade the currently viewed scene to another camera perspective.
+       The offscreen buffer, the camera and the texture card are made once,
+       and made again only when the window size has changed.
+    """
+
+    def __init__(self, clear_color=(0.5, 0.5, 0.5, 1), fov=90):
+        self.clear_color = clear_color
+        self.fov = fov
+        self.size = None
+        self.buffer = None
+
+    def setup(self, size):
+        if self.buffer is not None:
+            self.destroy()
+
+        self.size = size
+        self.buffer = base.win.make_texture_buffer('tex_buffer', *size)
+        self.buffer.set_clear_color_active(True)
+        self.buffer.set_clear_color(self.clear_color)
+        self.buffer.set_active(False)
+
+        self.cam = base.make_camera(self.buffer)
+        self.cam.node().get_lens().set_fov(self.fov)
+        self.cam.reparent_to(base.render)
+
+        self.card = self.buffer.get_texture_card()
+        # Screens slowly changes, having afterimage (road).
+        self.card.set_transparency(TransparencyAttrib.M_alpha)
+        # Screens quickly changes, having no afterimage.
+        # self.card.set_transparency(TransparencyAttrib.M_multisample)
+
+    def destroy(self):
+        self.card.remove_node()
+        self.cam.remove_node()
+        base.graphicsEngine.remove_window(self.buffer)
+        self.buffer = None
+
+    def fade(self, pos, look_at, duration, callback):
+        """Fade to the perspective from pos, facing look_at.
+            Args:
+                pos (Point3): New camera position.
+                look_at (NodePath or Point3): New position that the camera will face.
+                duration (float): Fade is done over a period of [duration] seconds.
+                callback (callable): Called when the fade has ended.
+        """
+        if (size := tuple(base.win.get_size())) != self.size:
+            self.setup(size)
+
+        self.buffer.set_active(True)
+        self.cam.set_pos(pos)
+        self.cam.look_at(look_at)
+        self.card.reparent_to(base.render2d)
+
+        Sequence(
+            self.card.colorScaleInterval(duration, 1, 0, blendType='easeInOut'),
+            Func(base.camera.set_pos, pos),
+            Func(base.camera.look_at, look_at),
+            Func(self.end),
+            Func(callback)
+        ).start()
+
+    def end(self):
+        self.card.detach_node()
+        self.buffer.set_active(False)
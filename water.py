@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+
+
+def wave_height(x, y, time, wave_h=3.0):
+    """Return the height of the water surface at (x, y) in the water's coordinate space.
+       This must be the same as the waveHeight in shaders/water_v.glsl.
+    """
+    return (math.sin(time + x / wave_h) + math.sin(time + y / wave_h)) * wave_h / 2
+
+
+class WaveEngine:
+    """Animate the z of the plane vertices by numpy.
+       The vertex array is viewed as (N, stride) float32 array without copying,
+       and the x / wave_h and y / wave_h terms are cached on construction.
+        Args:
+            geom_node (GeomNode): The node having the plane geom.
+            stride (int): The number of floats per vertex row.
+            wave_h (float): The height of the waves.
+            offset (tuple): (x, y) added to the vertices, to wave planes side by side seamlessly.
+    """
+
+    def __init__(self, geom_node, stride, wave_h=3.0, offset=(0, 0)):
+        self.geom_node = geom_node
+        self.stride = stride
+        self.offset = offset
+        self.stitches = None
+        self.set_wave_h(wave_h)
+
+    def set_offset(self, x, y):
+        self.offset = (x, y)
+        self.set_wave_h(self.wave_h)
+
+    def set_wave_h(self, wave_h):
+        self.wave_h = wave_h
+        view = self.get_vertex_view()
+        self.x_terms = (view[:, 0] + self.offset[0]) / wave_h
+        self.y_terms = (view[:, 1] + self.offset[1]) / wave_h
+        self.sin_x = np.empty_like(self.x_terms)
+        self.sin_y = np.empty_like(self.y_terms)
+
+    def set_stitches(self, vertices, ends):
+        """Keep the vertices in the middle of the pairs of the ends after waving,
+           so that the edges meeting the cells twice as large have no cracks.
+            Args:
+                vertices (numpy.ndarray): The indices of the vertices.
+                ends (numpy.ndarray): The (N, 2) indices of the vertices at both sides.
+        """
+        self.stitches = (vertices, ends[:, 0].copy(), ends[:, 1].copy()) if len(vertices) else None
+
+    def get_vertex_view(self):
+        geom = self.geom_node.modify_geom(0)
+        vdata_arr = geom.modify_vertex_data().modify_array(0)
+        arr = np.frombuffer(memoryview(vdata_arr), dtype=np.float32)
+        return arr.reshape(-1, self.stride)
+
+    def wave(self, time):
+        view = self.get_vertex_view()
+
+        np.add(self.x_terms, time, out=self.sin_x)
+        np.sin(self.sin_x, out=self.sin_x)
+        np.add(self.y_terms, time, out=self.sin_y)
+        np.sin(self.sin_y, out=self.sin_y)
+
+        np.add(self.sin_x, self.sin_y, out=self.sin_x)
+        np.multiply(self.sin_x, self.wave_h / 2, out=view[:, 2])
+
+        if self.stitches is not None:
+            vertices, starts, ends = self.stitches
+            view[vertices, 2] = (view[starts, 2] + view[ends, 2]) * 0.5